@@ -1,6 +1,13 @@
 import os
+import re
+import json
+import uuid
+import functools
+from types import MappingProxyType
+import httpx
 import streamlit as st
 from supabase import create_client, Client
+from postgrest.exceptions import APIError
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -9,6 +16,16 @@ load_dotenv()
 # Supabase configuration
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_ANON_KEY")
+SUPABASE_STORAGE_BUCKET = os.getenv("SUPABASE_STORAGE_BUCKET", "proposals")
+
+# Prefix for proposal files kept in Supabase Storage (stored as storage://<bucket>/<path>)
+STORAGE_URL_PREFIX = "storage://"
+
+# Error codes PostgREST returns for a view or function that hasn't been created yet
+MISSING_DB_OBJECT_CODES = {'42P01', '42883', 'PGRST202', 'PGRST205'}
+
+# Failures from Supabase queries: PostgREST errors and network/HTTP errors
+DB_ERRORS = (APIError, httpx.HTTPError)
 
 # OpenAI configuration
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
@@ -29,9 +46,25 @@ def init_openai():
 
 # Database helper functions
 class DatabaseManager:
+    # Optional views/functions from supabase_functions.sql found missing in this process
+    _missing_db_objects = set()
+
     def __init__(self):
         self.supabase = init_supabase()
 
+    def _rpc(self, function_name: str, params: dict):
+        """Call an optional database function, or return None if it isn't installed"""
+        if function_name in self._missing_db_objects:
+            return None
+        try:
+            response = self.supabase.rpc(function_name, params).execute()
+            return response.data
+        except APIError as e:
+            if e.code not in MISSING_DB_OBJECT_CODES:
+                raise
+            self._missing_db_objects.add(function_name)
+            return None
+
     # User Profile Functions
     def get_user_profile(self, user_id: str):
         """Get user profile by ID"""
@@ -47,6 +80,15 @@ class DatabaseManager:
             print(f"Error creating user profile: {str(e)}")
             return None
 
+    def create_user_profiles_bulk(self, profiles: list):
+        """Create several user profiles in a single insert"""
+        try:
+            response = self.supabase.table("user_profiles").insert(profiles).execute()
+            return response.data
+        except Exception as e:
+            print(f"Error creating user profiles: {str(e)}")
+            return []
+
     def update_user_profile(self, user_id: str, updates: dict):
         """Update user profile"""
         response = self.supabase.table("user_profiles").update(updates).eq("id", user_id).execute()
@@ -119,11 +161,14 @@ class DatabaseManager:
                                                                                             user_id).execute()
         return response.data
 
-    def get_team_members(self, rfp_id: str):
-        """Get team members for RFP"""
-        response = self.supabase.table("rfp_team_members").select("""
+    def get_team_members(self, rfp_id: str, role: str = None):
+        """Get team members for RFP, optionally only those with the given team role"""
+        query = self.supabase.table("rfp_team_members").select("""
             *, user_profiles(full_name, email, role)
-        """).eq("rfp_id", rfp_id).execute()
+        """).eq("rfp_id", rfp_id)
+        if role:
+            query = query.eq("role", role)
+        response = query.execute()
         return response.data
 
     # Vendor Functions
@@ -137,6 +182,35 @@ class DatabaseManager:
         response = self.supabase.table("vendors").select("*").execute()
         return response.data
 
+    def count_vendors(self):
+        """Count vendors without fetching the rows"""
+        response = self.supabase.table("vendors").select("id", count="exact").limit(1).execute()
+        return response.count or 0
+
+    def search_vendors(self, term: str, limit: int = 50, offset: int = 0):
+        """Search vendors by name or contact email (case-insensitive), or None if the term can't be sent"""
+        if re.search(r'[,()"\\]', term):
+            # Characters that are reserved in PostgREST's or=() syntax; the caller filters client-side instead
+            return None
+        query = self.supabase.table("vendors").select("*")
+        # postgrest 0.13 has no or_() builder, so the or filter is added as a raw query param
+        query.params = query.params.add("or", f"(name.ilike.*{term}*,contact_email.ilike.*{term}*)")
+        response = query.order("name").range(offset, offset + limit - 1).execute()
+        return response.data
+
+    def get_vendors_page(self, after_created_at: str = None, after_id: str = None, limit: int = 25):
+        """Get one page of vendors, newest first, starting after the given (created_at, id) cursor"""
+        query = self.supabase.table("vendors").select("*")
+        if after_created_at and after_id:
+            # Keyset condition (created_at, id) < (after_created_at, after_id); no OFFSET scan
+            query.params = query.params.add(
+                "or", f"(created_at.lt.{after_created_at},and(created_at.eq.{after_created_at},id.lt.{after_id}))"
+            )
+        # One order param: chained .order() calls send two, and PostgREST drops the id tie-breaker
+        query.params = query.params.add("order", "created_at.desc,id.desc")
+        response = query.limit(limit).execute()
+        return response.data
+
     def get_vendor_by_id(self, vendor_id: str):
         """Get vendor by ID"""
         response = self.supabase.table("vendors").select("*").eq("id", vendor_id).execute()
@@ -153,6 +227,23 @@ class DatabaseManager:
         response = self.supabase.table("proposals").insert(proposal_data).execute()
         return response.data[0] if response.data else None
 
+    def upload_proposal_file(self, rfp_id: str, file_name: str, file_content: bytes, content_type: str):
+        """Upload proposal document to Supabase Storage and return its storage reference"""
+        safe_name = re.sub(r"[^A-Za-z0-9._-]", "_", file_name)
+        object_path = f"{rfp_id}/{uuid.uuid4()}_{safe_name}"
+        self.supabase.storage.from_(SUPABASE_STORAGE_BUCKET).upload(
+            object_path, file_content, {"content-type": content_type or "application/octet-stream"}
+        )
+        return f"{STORAGE_URL_PREFIX}{SUPABASE_STORAGE_BUCKET}/{object_path}"
+
+    def get_proposal_file_url(self, file_url: str, expires_in: int = 3600):
+        """Get a signed download URL for a proposal file stored in Supabase Storage"""
+        if not file_url or not file_url.startswith(STORAGE_URL_PREFIX):
+            return None
+        bucket, object_path = file_url[len(STORAGE_URL_PREFIX):].split("/", 1)
+        response = self.supabase.storage.from_(bucket).create_signed_url(object_path, expires_in)
+        return response.get("signedURL") or response.get("signedUrl")
+
     def get_proposals_for_rfp(self, rfp_id: str):
         """Get all proposals for RFP"""
         response = self.supabase.table("proposals").select("""
@@ -161,6 +252,45 @@ class DatabaseManager:
         """).eq("rfp_id", rfp_id).execute()
         return response.data
 
+    def get_proposals_with_evaluations(self, proposal_ids: list):
+        """Get proposals with vendor and evaluations in one query, keyed by proposal id"""
+        if not proposal_ids:
+            return {}
+        response = self.supabase.table("proposals").select("""
+            *, vendors(name, contact_email, contact_person),
+            evaluations(*, user_profiles(full_name, role))
+        """).in_("id", proposal_ids).execute()
+        return {proposal['id']: proposal for proposal in response.data}
+
+    def get_score_summary_for_rfp(self, rfp_id: str):
+        """Get average evaluation scores per proposal for RFP, or None if the summary view is missing"""
+        if "proposal_score_summary" in self._missing_db_objects:
+            return None
+        try:
+            response = self.supabase.table("proposal_score_summary").select(
+                "vendor, functional, security, business, overall, evaluations, status"
+            ).eq("rfp_id", rfp_id).execute()
+            return response.data
+        except APIError as e:
+            if e.code not in MISSING_DB_OBJECT_CODES:
+                raise
+            self._missing_db_objects.add("proposal_score_summary")
+            return None
+
+    def get_evaluation_summary_for_rfp(self, rfp_id: str):
+        """Get evaluation counts and averages per vendor for RFP, or None if the summary function is missing"""
+        return self._rpc("rfp_evaluation_summary", {"p_rfp_id": rfp_id})
+
+    def get_proposals_for_rfps(self, rfp_ids: list):
+        """Get all proposals for several RFPs in one query"""
+        if not rfp_ids:
+            return []
+        response = self.supabase.table("proposals").select("""
+            *, vendors(name, contact_email, contact_person),
+            evaluations(*, user_profiles(full_name))
+        """).in_("rfp_id", rfp_ids).execute()
+        return response.data
+
     def update_proposal(self, proposal_id: str, updates: dict):
         """Update proposal"""
         response = self.supabase.table("proposals").update(updates).eq("id", proposal_id).execute()
@@ -171,16 +301,41 @@ class DatabaseManager:
         response = self.supabase.table("proposals").update(updates).in_("id", proposal_ids).execute()
         return response.data
 
+    def mark_pending_approval(self, proposal_id: str):
+        """Move proposal to under review and flag its summary for department head approval"""
+        result = self._rpc("mark_pending_approval", {"p_proposal_id": proposal_id})
+        if result is not None:
+            return result[0] if result else None
+
+        # Read-modify-write when the database function isn't installed
+        response = self.supabase.table("proposals").select("proposal_summary").eq("id", proposal_id).execute()
+        if not response.data:
+            return None
+        summary = response.data[0].get('proposal_summary') or ""
+        if summary.startswith("[PENDING_APPROVAL]"):
+            return None
+        return self.update_proposal(proposal_id, {
+            "status": "under_review",
+            "proposal_summary": "[PENDING_APPROVAL] " + summary
+        })
+
     # Evaluation Functions
     def create_evaluation(self, evaluation_data: dict):
         """Create new evaluation"""
         response = self.supabase.table("evaluations").insert(evaluation_data).execute()
         return response.data[0] if response.data else None
 
+    def create_evaluations_bulk(self, evaluations: list):
+        """Create several evaluations in a single insert"""
+        if not evaluations:
+            return []
+        response = self.supabase.table("evaluations").insert(evaluations).execute()
+        return response.data
+
     def get_evaluation(self, proposal_id: str, evaluator_id: str):
         """Get evaluation for proposal by evaluator"""
-        response = self.supabase.table("evaluations").select("*").eq("proposal_id", proposal_id).eq("evaluator_id",
-                                                                                                    evaluator_id).execute()
+        response = self.supabase.table("evaluations").select("*").eq("proposal_id", proposal_id).eq(
+            "evaluator_id", evaluator_id).limit(1).execute()
         return response.data[0] if response.data else None
 
     def update_evaluation(self, evaluation_id: str, updates: dict):
@@ -188,6 +343,22 @@ class DatabaseManager:
         response = self.supabase.table("evaluations").update(updates).eq("id", evaluation_id).execute()
         return response.data[0] if response.data else None
 
+    def submit_evaluation(self, evaluation_id: str, proposal_id: str, updates: dict):
+        """Save a final evaluation and move its proposal to under review"""
+        result = self._rpc("submit_evaluation_tx", {
+            "p_evaluation_id": evaluation_id,
+            "p_proposal_id": proposal_id,
+            "p_updates": updates
+        })
+        if result is not None:
+            return result[0] if result else None
+
+        # Two separate writes when the database function isn't installed
+        updated_evaluation = self.update_evaluation(evaluation_id, updates)
+        if updated_evaluation:
+            self.update_proposal(proposal_id, {"status": "under_review"})
+        return updated_evaluation
+
     def get_evaluations_for_proposal(self, proposal_id: str):
         """Get all evaluations for a proposal"""
         response = self.supabase.table("evaluations").select("""
@@ -252,8 +423,8 @@ class AIManager:
     def __init__(self):
         self.client = init_openai()
 
-    def generate_rfp_content(self, title: str, description: str, template: str = None, business_criteria: dict = None):
-        """Generate RFP content using OpenAI"""
+    def _rfp_content_prompt(self, title: str, description: str, template: str = None, business_criteria: dict = None):
+        """Build the RFP generation prompt"""
         prompt = f"""
 Generate a comprehensive Request for Proposal (RFP) document for:
 
@@ -280,25 +451,34 @@ Please create a detailed, professional RFP that includes:
 
 Make it comprehensive and professional.
 """
+        return prompt
 
-        try:
-            from openai import OpenAI
-            client = OpenAI(api_key=OPENAI_API_KEY)
+    def stream_rfp_content(self, title: str, description: str, template: str = None, business_criteria: dict = None):
+        """Generate RFP content using OpenAI, yielding text chunks as they arrive.
 
-            response = client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=2000,
-                temperature=0.7
-            )
-            return response.choices[0].message.content
-        except Exception as e:
-            import streamlit as st
-            st.error(f"Error generating RFP content: {str(e)}")
-            return None
+        Errors are raised to the caller, which may already hold part of the text.
+        """
+        prompt = self._rfp_content_prompt(title, description, template, business_criteria)
+
+        from openai import OpenAI
+        client = OpenAI(api_key=OPENAI_API_KEY)
+
+        stream = client.chat.completions.create(
+            model="gpt-3.5-turbo",
+            messages=[{"role": "user", "content": prompt}],
+            max_tokens=2000,
+            temperature=0.7,
+            stream=True
+        )
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
 
     def analyze_proposal(self, proposal_text: str, rfp_criteria: dict):
         """Analyze proposal against RFP criteria"""
+        # Instructions and criteria come before the proposal text, and the criteria are serialized
+        # with sorted keys, so the start of the prompt is byte-identical for every proposal of an RFP
+        criteria_json = json.dumps(rfp_criteria or {}, sort_keys=True, default=str)
         prompt = f"""
 Analyze the following proposal against the RFP criteria and provide:
 1. Summary of key points
@@ -306,7 +486,7 @@ Analyze the following proposal against the RFP criteria and provide:
 3. Strengths and weaknesses
 4. Recommended questions for evaluation
 
-RFP Criteria: {rfp_criteria}
+RFP Criteria: {criteria_json}
 
 Proposal: {proposal_text}
 """
@@ -372,12 +552,6 @@ def init_session_state():
             st.session_state.rfp_id = None
         if 'proposal_id' not in st.session_state:
             st.session_state.proposal_id = None
-        if 'show_add_vendor' not in st.session_state:
-            st.session_state.show_add_vendor = False
-        if 'show_edit_vendor' not in st.session_state:
-            st.session_state.show_edit_vendor = False
-        if 'edit_vendor_id' not in st.session_state:
-            st.session_state.edit_vendor_id = None
     except:
         pass
 
@@ -444,6 +618,7 @@ def register_user(email: str, password: str, full_name: str, role: str):
 
 
 # Utility functions
+@functools.lru_cache(maxsize=1024)
 def format_date(date_str):
     """Format date string for display"""
     if not date_str:
@@ -456,27 +631,36 @@ def format_date(date_str):
         return date_str
 
 
+STATUS_COLORS = MappingProxyType({
+    'draft': 'gray',
+    'pending_approval': 'orange',
+    'approved': 'blue',
+    'published': 'green',
+    'evaluation': 'purple',
+    'completed': 'darkgreen',
+    'cancelled': 'red',
+    'submitted': 'blue',
+    'under_review': 'orange',
+    'shortlisted': 'green',
+    'rejected': 'red',
+    'ready_for_approval': 'purple',
+    'pending': 'orange',
+    'recommend': 'green',
+    'conditional': 'yellow',
+    'not_recommend': 'red'
+})
+
+
 def get_status_color(status: str) -> str:
     """Get color for status display"""
-    status_colors = {
-        'draft': 'gray',
-        'pending_approval': 'orange',
-        'approved': 'blue',
-        'published': 'green',
-        'evaluation': 'purple',
-        'completed': 'darkgreen',
-        'cancelled': 'red',
-        'submitted': 'blue',
-        'under_review': 'orange',
-        'shortlisted': 'green',
-        'rejected': 'red',
-        'ready_for_approval': 'purple',
-        'pending': 'orange',
-        'recommend': 'green',
-        'conditional': 'yellow',
-        'not_recommend': 'red'
-    }
-    return status_colors.get(status, 'gray')
+    return STATUS_COLORS.get(status, 'gray')
+
+
+@functools.lru_cache(maxsize=64)
+def status_badge(status: str) -> str:
+    """Get the status badge HTML for a status"""
+    return (f'<span class="status-badge" style="background-color: {get_status_color(status)};">'
+            f'{status.replace("_", " ").title()}</span>')
 
 
 # Constants - Updated to include new workflow statuses
@@ -487,12 +671,143 @@ EVALUATION_STATUSES = ['pending', 'completed']
 RECOMMENDATION_OPTIONS = ['recommend', 'conditional', 'not_recommend']
 
 
-# Initialize globals - these will be imported when needed
+# Initialize globals - these will be imported when needed. Both are shared across reruns
+# and sessions; the database client only ever uses the anon key, login uses its own client
+@st.cache_resource(show_spinner=False)
 def get_db():
     """Get database manager instance"""
     return DatabaseManager()
 
 
+@st.cache_resource(show_spinner=False)
 def get_ai():
     """Get AI manager instance"""
-    return AIManager()
\ No newline at end of file
+    return AIManager()
+
+
+# Cached reads - Streamlit reruns the whole page on every interaction, so common
+# lookups are memoized briefly. After writing data, call the matching clear_*_caches()
+# helper at the end of this section so every cache built on that data is invalidated.
+@st.cache_data(ttl=30, show_spinner=False)
+def cached_rfps_for_user(user_id: str):
+    """Get RFPs accessible to user (cached)"""
+    return get_db().get_rfps_for_user(user_id)
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def cached_rfp_by_id(rfp_id: str):
+    """Get RFP by ID with creator name (cached)"""
+    return get_db().get_rfp_by_id(rfp_id)
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def cached_team_members(rfp_id: str):
+    """Get team members for RFP (cached)"""
+    return get_db().get_team_members(rfp_id)
+
+
+@st.cache_data(ttl=120, show_spinner=False)
+def cached_users_by_id():
+    """Get all user profiles keyed by user id (cached)"""
+    return {user['id']: user for user in get_db().get_all_users()}
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def cached_rfp_templates():
+    """Get active RFP templates (cached)"""
+    return get_db().get_rfp_templates()
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def cached_vendors():
+    """Get all vendors (cached)"""
+    return get_db().get_all_vendors()
+
+
+@st.cache_data(ttl=30, show_spinner=False)
+def cached_vendor_by_id(vendor_id: str):
+    """Get vendor by ID (cached)"""
+    return get_db().get_vendor_by_id(vendor_id)
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def cached_vendors_page(after_created_at: str = None, after_id: str = None, limit: int = 25):
+    """Get one page of vendors after the given cursor (cached)"""
+    return get_db().get_vendors_page(after_created_at, after_id, limit)
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def cached_vendor_count():
+    """Count vendors (cached)"""
+    return get_db().count_vendors()
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def cached_vendor_search_index():
+    """Get all vendors with parallel lowercased name and email lists, for client-side search"""
+    # Built from a single fetch so the three lists always line up by position
+    vendors = get_db().get_all_vendors()
+    names = [(v.get('name') or '').lower() for v in vendors]
+    emails = [(v.get('contact_email') or '').lower() for v in vendors]
+    return vendors, names, emails
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def cached_vendor_search(term: str):
+    """Search vendors by name or contact email (cached)"""
+    return get_db().search_vendors(term)
+
+
+@st.cache_data(ttl=30, show_spinner=False)
+def cached_proposals_for_rfps(rfp_ids: tuple):
+    """Get proposals with their evaluations for several RFPs (cached)"""
+    return get_db().get_proposals_for_rfps(list(rfp_ids))
+
+
+@st.cache_data(ttl=30, show_spinner=False)
+def cached_score_summary_for_rfp(rfp_id: str):
+    """Get average evaluation scores per proposal for RFP (cached)"""
+    return get_db().get_score_summary_for_rfp(rfp_id)
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def cached_proposal_with_evaluations(proposal_id: str):
+    """Get a proposal with its vendor and evaluations (cached)"""
+    return get_db().get_proposals_with_evaluations([proposal_id]).get(proposal_id)
+
+
+@st.cache_data(ttl=30, show_spinner=False)
+def cached_evaluation(proposal_id: str, evaluator_id: str):
+    """Get evaluation for proposal by evaluator (cached)"""
+    return get_db().get_evaluation(proposal_id, evaluator_id)
+
+
+@st.cache_data(ttl=30, show_spinner=False)
+def cached_evaluation_summary_for_rfp(rfp_id: str):
+    """Get evaluation counts and averages per vendor for RFP (cached)"""
+    return get_db().get_evaluation_summary_for_rfp(rfp_id)
+
+
+def clear_rfp_caches():
+    """Invalidate cached RFP reads after an RFP is created or updated"""
+    cached_rfps_for_user.clear()
+    cached_rfp_by_id.clear()
+
+
+def clear_vendor_caches():
+    """Invalidate cached vendor reads after a vendor is created or updated"""
+    cached_vendors.clear()
+    cached_vendor_by_id.clear()
+    cached_vendors_page.clear()
+    cached_vendor_count.clear()
+    cached_vendor_search_index.clear()
+    cached_vendor_search.clear()
+
+
+def clear_proposal_caches():
+    """Invalidate cached proposal and evaluation reads after either is written"""
+    cached_proposals_for_rfps.clear()
+    cached_score_summary_for_rfp.clear()
+    cached_proposal_with_evaluations.clear()
+    cached_evaluation.clear()
+    cached_evaluation_summary_for_rfp.clear()
@@ -1,5 +1,5 @@
 import streamlit as st
-from config import get_db, get_ai, format_date
+from config import get_db, get_ai, format_date, cached_evaluation, clear_proposal_caches
 from datetime import datetime
 
 
@@ -110,7 +110,7 @@ def show_evaluate_proposal_page():
 
     # Get evaluation details
     try:
-        evaluation = db.get_evaluation(proposal_id, st.session_state.user.id)
+        evaluation = cached_evaluation(proposal_id, st.session_state.user.id)
         if not evaluation:
             st.error("Evaluation not found")
             return
@@ -307,14 +307,16 @@ def show_evaluate_proposal_page():
 
             # Update evaluation
             try:
-                updated_evaluation = db.update_evaluation(evaluation_id, evaluation_updates)
+                if submit_evaluation:
+                    # Also moves the proposal to under review, atomically when submit_evaluation_tx is installed
+                    updated_evaluation = db.submit_evaluation(evaluation_id, proposal_id, evaluation_updates)
+                else:
+                    updated_evaluation = db.update_evaluation(evaluation_id, evaluation_updates)
                 if updated_evaluation:
+                    clear_proposal_caches()
                     if submit_evaluation:
                         st.success("🎉 Evaluation submitted successfully!")
 
-                        # Update proposal status to under review
-                        db.update_proposal(proposal_id, {"status": "under_review"})
-
                         # Check if all evaluations are complete for this proposal
                         all_evaluations = db.get_evaluations_for_proposal(proposal_id)
                         completed_evaluations = [e for e in all_evaluations if e.get('status') == 'completed']
@@ -227,11 +227,7 @@ def show_procurement_manager_dashboard(user_id):
                     st.markdown(f"**{rfp['title']}**")
                     st.caption(f"Created: {format_date(rfp['created_at'])}")
                 with col2:
-                    status_color = get_status_color(rfp['status'])
-                    st.markdown(
-                        f'<span class="status-badge" style="background-color: {status_color};">{rfp["status"].replace("_", " ").title()}</span>',
-                        unsafe_allow_html=True
-                    )
+                    st.markdown(status_badge(rfp['status']), unsafe_allow_html=True)
                 with col3:
                     if st.button("View", key=f"view_rfp_{rfp['id']}"):
                         st.session_state.rfp_id = rfp['id']
@@ -473,11 +469,7 @@ def show_my_rfps():
                         st.caption(f"Due: {format_date(rfp['due_date'])}")
 
                 with col2:
-                    status_color = get_status_color(rfp['status'])
-                    st.markdown(
-                        f'<span class="status-badge" style="background-color: {status_color};">{rfp["status"].replace("_", " ").title()}</span>',
-                        unsafe_allow_html=True
-                    )
+                    st.markdown(status_badge(rfp['status']), unsafe_allow_html=True)
 
                 with col3:
                     # Count proposals - handle missing proposals gracefully
@@ -786,6 +778,7 @@ def show_approvals_page():
                         if st.button("✅ Approve RFP", key=f"approve_rfp_{rfp['id']}", type="primary"):
                             try:
                                 db.update_rfp(rfp['id'], {"status": "approved", "approved_by": user_id})
+                                clear_rfp_caches()
                                 st.success("✅ RFP Approved!")
                                 st.rerun()
                             except Exception as e:
@@ -794,6 +787,7 @@ def show_approvals_page():
                         if st.button("❌ Reject", key=f"reject_rfp_{rfp['id']}"):
                             try:
                                 db.update_rfp(rfp['id'], {"status": "draft"})
+                                clear_rfp_caches()
                                 st.warning("❌ RFP sent back to draft")
                                 st.rerun()
                             except Exception as e:
@@ -872,6 +866,7 @@ def show_approvals_page():
                                             "status": "shortlisted",
                                             "proposal_summary": clean_summary
                                         })
+                                        clear_proposal_caches()
 
                                         # Try to create a notification (if table exists)
                                         try:
@@ -911,6 +906,7 @@ def show_approvals_page():
                                             "status": "rejected",
                                             "proposal_summary": clean_summary
                                         })
+                                        clear_proposal_caches()
 
                                         # Try to create a notification (if table exists)
                                         try:
@@ -949,6 +945,7 @@ def show_approvals_page():
                                             "status": "under_review",
                                             "proposal_summary": clean_summary
                                         })
+                                        clear_proposal_caches()
                                         st.info("🔄 Sent back for additional review")
                                         st.rerun()
                                     except Exception as e:
@@ -1,20 +1,50 @@
 import streamlit as st
-from config import get_db, get_ai, format_date
+from config import (get_db, get_ai, format_date, status_badge, cached_rfps_for_user, cached_vendors,
+                    cached_proposals_for_rfps, cached_score_summary_for_rfp, cached_proposal_with_evaluations,
+                    PROPOSAL_STATUSES, DB_ERRORS, clear_rfp_caches, clear_vendor_caches, clear_proposal_caches)
 import io
-import base64
+import csv
+import hashlib
+import functools
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+import pandas as pd
+
+try:
+    # SIMD-accelerated base64, output is identical to the stdlib module
+    import pybase64 as _b64
+except ImportError:
+    import base64 as _b64
+
+# Upper bound on extracted proposal text sent to the AI
+MAX_ANALYSIS_CHARS = 50000
+
+DOCX_MIME_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+PROPOSALS_PER_PAGE = 25
+
+# Runs proposal writes off the script thread so the UI doesn't wait on the database
+_EXECUTOR = ThreadPoolExecutor(max_workers=4)
+
+_STATUS_INDEX = {status: i for i, status in enumerate(PROPOSAL_STATUSES)}
+
+RECOMMENDATION_COLORS = {'recommend': 'green', 'conditional': 'orange', 'not_recommend': 'red'}
+
+SCORE_FIELDS = ('functional_score', 'it_security_score', 'business_score', 'overall_score')
 
 
 def show_proposals_page():
     """Main proposals management page"""
     st.markdown('<h1 class="main-header">📋 Proposal Management</h1>', unsafe_allow_html=True)
 
-    db = get_db()
+    _reap_pending_writes()
+
     user_id = st.session_state.user.id
 
     # Get user's RFPs to show proposals for
     try:
-        rfps = db.get_rfps_for_user(user_id)
+        rfps = cached_rfps_for_user(user_id)
         # Filter to only published RFPs that can receive proposals
         active_rfps = [rfp for rfp in rfps if rfp['status'] in ['published', 'evaluation']]
     except Exception as e:
@@ -37,6 +67,31 @@ def show_proposals_page():
         show_proposal_details(active_rfps)
 
 
+def _reap_pending_writes():
+    """Report background writes that finished since the last rerun"""
+    pending_writes = st.session_state.get('pending_writes')
+    if not pending_writes:
+        return
+
+    still_pending = []
+    for label, proposal_id, future in pending_writes:
+        if not future.done():
+            still_pending.append((label, proposal_id, future))
+            continue
+        st.session_state.get('approving', set()).discard(proposal_id)
+        # The optimistic status only covers the write in flight; once it settles the page goes back to
+        # the stored proposal, so a failed write can be retried and a later send-back can be re-sent
+        st.session_state.get('proposal_status', {}).pop(proposal_id, None)
+        try:
+            future.result()
+        except Exception as e:
+            st.toast(f"❌ {label} failed: {str(e)}")
+        else:
+            clear_proposal_caches()
+            st.toast(f"✅ {label} saved")
+    st.session_state.pending_writes = still_pending
+
+
 def show_submit_proposal_form(active_rfps):
     """Form to submit new proposals"""
     st.markdown("### 📥 Submit New Proposal")
@@ -47,7 +102,7 @@ def show_submit_proposal_form(active_rfps):
 
     db = get_db()
 
-    with st.form(f"submit_proposal_{hash(str(st.session_state.user.id))}", clear_on_submit=False):
+    with st.form(f"submit_proposal_{st.session_state.user.id}", clear_on_submit=False):
         col1, col2 = st.columns([2, 1])
 
         with col1:
@@ -61,20 +116,12 @@ def show_submit_proposal_form(active_rfps):
 
             # Show RFP details
             with st.expander("📋 RFP Details"):
-                st.markdown(f"**Description:** {selected_rfp['description']}")
-
-                # Show evaluation criteria
-                if selected_rfp.get('evaluation_criteria'):
-                    eval_criteria = selected_rfp['evaluation_criteria']
-                    st.markdown("**Evaluation Criteria:**")
-                    for category, details in eval_criteria.items():
-                        if isinstance(details, dict):
-                            st.write(f"• {category.replace('_', ' ').title()}: {details.get('weight', 0)}%")
+                _render_rfp_details(selected_rfp)
 
         with col2:
             st.markdown("### Vendor Information")
             # Vendor selection or creation
-            vendors = db.get_all_vendors()
+            vendors = cached_vendors()
             if vendors:
                 vendor_options = {f"{v['name']} ({v['contact_email']})": v['id'] for v in vendors}
                 vendor_options["➕ Add New Vendor"] = "new"
@@ -152,6 +199,7 @@ def show_submit_proposal_form(active_rfps):
                 try:
                     new_vendor = db.create_vendor(vendor_data)
                     if new_vendor:
+                        clear_vendor_caches()
                         selected_vendor_id = new_vendor['id']
                         st.success(f"✅ Created new vendor: {new_vendor_name}")
                     else:
@@ -163,30 +211,41 @@ def show_submit_proposal_form(active_rfps):
 
             # Process file upload
             try:
-                file_content = uploaded_file.read()
-
-                # For now, we'll store the file content as base64 in the database
-                # In production, you'd upload to cloud storage (S3, GCS, etc.)
-                file_base64 = base64.b64encode(file_content).decode()
-                file_url = f"data:{uploaded_file.type};base64,{file_base64}"
-
-                # Extract text for AI analysis if needed
-                proposal_text = ""
-                if auto_analyze:
-                    # Simple text extraction (in production, use proper PDF/Word parsers)
-                    if uploaded_file.type == "text/plain":
-                        proposal_text = file_content.decode('utf-8')
-                    else:
-                        proposal_text = f"File: {uploaded_file.name} ({uploaded_file.type})"
-
-                # Generate AI summary if not provided
-                if not proposal_summary and auto_analyze:
-                    with st.spinner("🤖 Analyzing proposal..."):
-                        ai = get_ai()
-                        # Get RFP criteria for analysis
-                        rfp_criteria = selected_rfp.get('evaluation_criteria', {})
-                        analysis = ai.analyze_proposal(proposal_text, rfp_criteria)
-                        proposal_summary = analysis if analysis else "AI analysis failed - please add manual summary"
+                file_content = uploaded_file.getvalue()
+
+                # Reuse the upload and extracted text when the same file is resubmitted after a rerun
+                file_hash = hashlib.blake2b(file_content, digest_size=16).hexdigest()
+                upload_cache = st.session_state.setdefault('_upload_cache', {})
+                cached_upload = upload_cache.setdefault(f"{selected_rfp_id}:{file_hash}", {})
+
+                # Upload in a worker thread while the text is extracted and analyzed here;
+                # the AI call reports errors with st.error so it has to stay on the script thread
+                with ThreadPoolExecutor(max_workers=1) as executor:
+                    upload_future = None
+                    if 'file_url' not in cached_upload:
+                        upload_future = executor.submit(_store_proposal_file, db, selected_rfp_id,
+                                                        uploaded_file.name, file_content, uploaded_file.type)
+
+                    # Extract text for AI analysis if needed
+                    proposal_text = ""
+                    if auto_analyze:
+                        if 'text' not in cached_upload:
+                            cached_upload['text'] = extract_proposal_text(file_content, uploaded_file.type,
+                                                                          uploaded_file.name)
+                        proposal_text = cached_upload['text']
+
+                    # Generate AI summary if not provided
+                    if not proposal_summary and auto_analyze:
+                        with st.spinner("🤖 Analyzing proposal..."):
+                            ai = get_ai()
+                            # Get RFP criteria for analysis
+                            rfp_criteria = selected_rfp.get('evaluation_criteria', {})
+                            analysis = ai.analyze_proposal(proposal_text, rfp_criteria)
+                            proposal_summary = analysis if analysis else "AI analysis failed - please add manual summary"
+
+                    if upload_future:
+                        cached_upload['file_url'] = upload_future.result()
+                file_url = cached_upload['file_url']
 
                 # Create proposal
                 proposal_data = {
@@ -201,26 +260,27 @@ def show_submit_proposal_form(active_rfps):
                 new_proposal = db.create_proposal(proposal_data)
 
                 if new_proposal:
+                    clear_proposal_caches()
                     st.success("🎉 Proposal submitted successfully!")
 
                     # Create evaluation records for team members if requested
                     if send_to_evaluation:
-                        team_members = db.get_team_members(selected_rfp_id)
-                        evaluators = [member for member in team_members if member.get('role') == 'evaluator']
-
-                        for evaluator in evaluators:
-                            evaluation_data = {
+                        evaluators = db.get_team_members(selected_rfp_id, role='evaluator')
+                        db.create_evaluations_bulk([
+                            {
                                 "proposal_id": new_proposal['id'],
                                 "evaluator_id": evaluator['user_id'],
                                 "status": "pending"
                             }
-                            db.create_evaluation(evaluation_data)
+                            for evaluator in evaluators
+                        ])
 
                         st.info(f"📨 Evaluation requests sent to {len(evaluators)} team members")
 
                     # Update RFP status to evaluation if it was just published
                     if selected_rfp['status'] == 'published':
                         db.update_rfp(selected_rfp_id, {"status": "evaluation"})
+                        clear_rfp_caches()
 
                     st.rerun()
                 else:
@@ -230,40 +290,127 @@ def show_submit_proposal_form(active_rfps):
                 st.error(f"Error processing proposal: {str(e)}")
 
 
+def _render_rfp_details(selected_rfp):
+    """Render the description and evaluation criteria of the selected RFP"""
+    st.markdown(f"**Description:** {selected_rfp['description']}")
+
+    # Show evaluation criteria
+    if selected_rfp.get('evaluation_criteria'):
+        st.markdown("**Evaluation Criteria:**")
+        st.markdown(_criteria_markdown(selected_rfp['evaluation_criteria']))
+
+
+@st.cache_data(show_spinner=False)
+def _criteria_markdown(eval_criteria):
+    """Pre-render evaluation criteria weights as a markdown list"""
+    return "\n".join(
+        f"- {category.replace('_', ' ').title()}: {details.get('weight', 0)}%"
+        for category, details in eval_criteria.items()
+        if isinstance(details, dict)
+    )
+
+
+def _store_proposal_file(db, rfp_id, file_name, file_content, content_type):
+    """Upload a proposal document and return the reference to store on the proposal"""
+    # Upload to Supabase Storage and keep only the object reference in the database
+    try:
+        return db.upload_proposal_file(rfp_id, file_name, file_content, content_type)
+    except Exception as e:
+        # Fall back to an inline data URL if the storage bucket isn't set up
+        print(f"Error uploading proposal file: {str(e)}")
+        file_base64 = _b64.b64encode(file_content).decode('ascii')
+        return f"data:{content_type};base64,{file_base64}"
+
+
+def extract_proposal_text(file_content, file_type, file_name):
+    """Extract plain text from an uploaded proposal document for AI analysis"""
+    try:
+        if file_type == "text/plain":
+            text = file_content.decode('utf-8', errors='ignore')
+        elif file_type == "application/pdf":
+            import fitz  # PyMuPDF
+            with fitz.open(stream=file_content, filetype="pdf") as doc:
+                text = "\n".join(page.get_text("text") for page in doc)
+        elif file_type == DOCX_MIME_TYPE:
+            from docx import Document
+            text = "\n".join(p.text for p in Document(io.BytesIO(file_content)).paragraphs)
+        else:
+            text = ""
+    except Exception as e:
+        print(f"Error extracting proposal text: {str(e)}")
+        text = ""
+
+    if not text.strip():
+        return f"File: {file_name} ({file_type})"
+    return text[:MAX_ANALYSIS_CHARS]
+
+
+def average_scores(evaluations):
+    """Count completed evaluations and average their functional, security, business and overall scores"""
+    completed = [e for e in evaluations if e.get('status') == 'completed']
+    if not completed:
+        return 0, (0.0, 0.0, 0.0, 0.0)
+
+    count = len(completed)
+    return count, tuple(sum(e.get(field) or 0 for e in completed) / count for field in SCORE_FIELDS)
+
+
+@functools.lru_cache(maxsize=256)
+def _classify(avg_overall, recommend_count, not_recommend_count):
+    """Overall proposal status from the average score and recommendation counts"""
+    if recommend_count > not_recommend_count:
+        return "🟢 Strong Candidate" if avg_overall >= 70 else "🟡 Conditional"
+    if recommend_count == not_recommend_count:
+        return "🟡 Conditional"
+    return "🔴 Not Recommended"
+
+
+def _proposal_score_row(proposal):
+    """Summarize a proposal's embedded evaluations, matching the proposal_score_summary view"""
+    eval_count, (functional, security, business, overall) = average_scores(proposal.get('evaluations') or [])
+    return {
+        'vendor': (proposal.get('vendors') or {}).get('name', 'Unknown'),
+        'functional': functional,
+        'security': security,
+        'business': business,
+        'overall': overall,
+        'evaluations': eval_count,
+        'status': proposal['status']
+    }
+
+
 def show_proposal_overview(active_rfps):
     """Overview of all proposals"""
     st.markdown("### 📊 Proposal Overview")
 
     db = get_db()
 
-    # Get proposals for each RFP
-    all_proposals = []
-    for rfp in active_rfps:
-        try:
-            proposals = db.get_proposals_for_rfp(rfp['id'])
-            for proposal in proposals:
-                proposal['rfp_title'] = rfp['title']
-            all_proposals.extend(proposals)
-        except Exception as e:
-            st.error(f"Error loading proposals for {rfp['title']}: {str(e)}")
+    # Get proposals for all active RFPs in one query
+    rfp_title_by_id = {rfp['id']: rfp['title'] for rfp in active_rfps}
+    try:
+        all_proposals = cached_proposals_for_rfps(tuple(rfp_title_by_id))
+    except Exception as e:
+        st.error(f"Error loading proposals: {str(e)}")
+        all_proposals = []
+
+    for proposal in all_proposals:
+        proposal['rfp_title'] = rfp_title_by_id.get(proposal['rfp_id'], 'Unknown RFP')
 
     if not all_proposals:
         st.info("📭 No proposals submitted yet")
         return
 
     # Summary statistics
+    status_counts = Counter(p['status'] for p in all_proposals)
     col1, col2, col3, col4 = st.columns(4)
     with col1:
         st.metric("Total Proposals", len(all_proposals))
     with col2:
-        submitted_count = len([p for p in all_proposals if p['status'] == 'submitted'])
-        st.metric("New Submissions", submitted_count)
+        st.metric("New Submissions", status_counts['submitted'])
     with col3:
-        shortlisted_count = len([p for p in all_proposals if p['status'] == 'shortlisted'])
-        st.metric("Shortlisted", shortlisted_count)
+        st.metric("Shortlisted", status_counts['shortlisted'])
     with col4:
-        under_review_count = len([p for p in all_proposals if p['status'] == 'under_review'])
-        st.metric("Under Review", under_review_count)
+        st.metric("Under Review", status_counts['under_review'])
 
     # Proposals table
     st.markdown("### Proposal List")
@@ -273,21 +420,41 @@ def show_proposal_overview(active_rfps):
     with col1:
         rfp_filter = st.selectbox("Filter by RFP", ["All"] + [rfp['title'] for rfp in active_rfps])
     with col2:
-        status_filter = st.selectbox("Filter by Status",
-                                     ["All", "submitted", "under_review", "shortlisted", "rejected"])
+        status_filter = st.selectbox("Filter by Status", ["All"] + PROPOSAL_STATUSES)
     with col3:
         if st.button("🔄 Refresh"):
+            clear_proposal_caches()
             st.rerun()
 
-    # Apply filters
-    filtered_proposals = all_proposals
-    if rfp_filter != "All":
-        filtered_proposals = [p for p in filtered_proposals if p['rfp_title'] == rfp_filter]
-    if status_filter != "All":
-        filtered_proposals = [p for p in filtered_proposals if p['status'] == status_filter]
+    # Apply filters in a single pass, reusing the full list when nothing is filtered
+    if rfp_filter == "All" and status_filter == "All":
+        filtered_proposals = all_proposals
+    else:
+        filtered_proposals = [p for p in all_proposals
+                              if (rfp_filter == "All" or p['rfp_title'] == rfp_filter)
+                              and (status_filter == "All" or p['status'] == status_filter)]
+
+    # Paginate so the number of widgets per rerun stays bounded
+    page_count = max(1, -(-len(filtered_proposals) // PROPOSALS_PER_PAGE))
+    if st.session_state.get('proposal_overview_page', 1) > page_count:
+        st.session_state.proposal_overview_page = 1
+    page = 1
+    if page_count > 1:
+        page = st.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count, step=1,
+                               key="proposal_overview_page")
+    start = (page - 1) * PROPOSALS_PER_PAGE
+    page_proposals = filtered_proposals[start:start + PROPOSALS_PER_PAGE]
+    if page_count > 1:
+        st.caption(f"Showing {start + 1}-{start + len(page_proposals)} of {len(filtered_proposals)} proposals")
+
+    # Truncate summaries once for the rows on this page
+    summaries = {
+        p['id']: p['proposal_summary'][:200] + "..." if len(p['proposal_summary']) > 200 else p['proposal_summary']
+        for p in page_proposals if p.get('proposal_summary')
+    }
 
     # Display proposals
-    for proposal in filtered_proposals:
+    for proposal in page_proposals:
         with st.expander(
                 f"📄 {proposal.get('rfp_title', 'Unknown RFP')} - {proposal.get('vendors', {}).get('name', 'Unknown Vendor')}"):
             col1, col2, col3 = st.columns([2, 1, 1])
@@ -295,29 +462,19 @@ def show_proposal_overview(active_rfps):
             with col1:
                 st.markdown(f"**Vendor:** {proposal.get('vendors', {}).get('name', 'Unknown')}")
                 st.markdown(f"**Contact:** {proposal.get('vendors', {}).get('contact_email', 'No email')}")
-                if proposal.get('proposal_summary'):
-                    st.markdown(f"**Summary:** {proposal['proposal_summary'][:200]}...")
+                if proposal['id'] in summaries:
+                    st.markdown(f"**Summary:** {summaries[proposal['id']]}")
                 st.caption(f"Submitted: {format_date(proposal.get('submitted_date', ''))}")
 
             with col2:
                 current_status = proposal['status']
-                status_color = {
-                    'submitted': 'blue',
-                    'under_review': 'orange',
-                    'shortlisted': 'green',
-                    'rejected': 'red'
-                }.get(current_status, 'gray')
-
-                st.markdown(
-                    f'<span class="status-badge" style="background-color: {status_color};">{current_status.replace("_", " ").title()}</span>',
-                    unsafe_allow_html=True
-                )
+                st.markdown(status_badge(current_status), unsafe_allow_html=True)
 
                 # Quick status change
                 new_status = st.selectbox(
                     "Change Status",
-                    ["submitted", "under_review", "shortlisted", "rejected"],
-                    index=["submitted", "under_review", "shortlisted", "rejected"].index(current_status),
+                    PROPOSAL_STATUSES,
+                    index=_STATUS_INDEX.get(current_status, 0),
                     key=f"status_{proposal['id']}"
                 )
 
@@ -325,6 +482,7 @@ def show_proposal_overview(active_rfps):
                     if st.button("Update", key=f"update_{proposal['id']}"):
                         try:
                             db.update_proposal(proposal['id'], {"status": new_status})
+                            clear_proposal_caches()
                             st.success("Status updated!")
                             st.rerun()
                         except Exception as e:
@@ -338,94 +496,51 @@ def show_proposal_overview(active_rfps):
 
                 if proposal.get('proposal_file_url'):
                     if st.button("📁 Download", key=f"download_{proposal['id']}"):
-                        # Handle file download
-                        st.info("File download functionality - implementation depends on storage solution")
+                        try:
+                            download_url = db.get_proposal_file_url(proposal['proposal_file_url'])
+                            if download_url:
+                                st.markdown(f"[⬇️ Open proposal document]({download_url})")
+                            else:
+                                st.info("This proposal was stored inline before file storage was enabled")
+                        except Exception as e:
+                            st.error(f"Error creating download link: {str(e)}")
 
 
 def show_proposal_details(active_rfps):
     """Detailed proposal analysis"""
     st.markdown("### 🔍 Detailed Proposal Analysis")
 
-    db = get_db()
-
     # RFP selection for detailed analysis
     if active_rfps:
         rfp_options = {rfp['title']: rfp['id'] for rfp in active_rfps}
         selected_rfp_title = st.selectbox("Select RFP for Analysis", list(rfp_options.keys()))
         selected_rfp_id = rfp_options[selected_rfp_title]
 
-        # Get proposals for selected RFP
+        # Scores are averaged in Postgres when the summary view is installed,
+        # otherwise from the evaluations embedded in the proposals query
         try:
-            proposals = db.get_proposals_for_rfp(selected_rfp_id)
+            proposal_scores = cached_score_summary_for_rfp(selected_rfp_id)
+            if proposal_scores is None:
+                proposal_scores = [_proposal_score_row(p) for p in cached_proposals_for_rfps((selected_rfp_id,))]
         except Exception as e:
             st.error(f"Error loading proposals: {str(e)}")
-            proposals = []
+            proposal_scores = []
 
-        if not proposals:
+        if not proposal_scores:
             st.info(f"📭 No proposals submitted for '{selected_rfp_title}' yet")
             return
 
         # Show detailed analysis
         st.markdown(f"### Analysis for: {selected_rfp_title}")
 
-        # Get evaluation data
-        proposal_scores = []
-        for proposal in proposals:
-            try:
-                evaluations = db.get_evaluations_for_proposal(proposal['id'])
-
-                if evaluations:
-                    # Calculate average scores
-                    total_functional = sum(
-                        [e.get('functional_score', 0) for e in evaluations if e.get('functional_score')])
-                    total_security = sum(
-                        [e.get('it_security_score', 0) for e in evaluations if e.get('it_security_score')])
-                    total_business = sum([e.get('business_score', 0) for e in evaluations if e.get('business_score')])
-                    total_overall = sum([e.get('overall_score', 0) for e in evaluations if e.get('overall_score')])
-                    eval_count = len([e for e in evaluations if e.get('status') == 'completed'])
-
-                    if eval_count > 0:
-                        proposal_scores.append({
-                            'vendor': proposal.get('vendors', {}).get('name', 'Unknown'),
-                            'functional': total_functional / eval_count,
-                            'security': total_security / eval_count,
-                            'business': total_business / eval_count,
-                            'overall': total_overall / eval_count,
-                            'evaluations': eval_count,
-                            'status': proposal['status']
-                        })
-                    else:
-                        proposal_scores.append({
-                            'vendor': proposal.get('vendors', {}).get('name', 'Unknown'),
-                            'functional': 0,
-                            'security': 0,
-                            'business': 0,
-                            'overall': 0,
-                            'evaluations': 0,
-                            'status': proposal['status']
-                        })
-                else:
-                    proposal_scores.append({
-                        'vendor': proposal.get('vendors', {}).get('name', 'Unknown'),
-                        'functional': 0,
-                        'security': 0,
-                        'business': 0,
-                        'overall': 0,
-                        'evaluations': 0,
-                        'status': proposal['status']
-                    })
-            except Exception as e:
-                st.error(f"Error loading evaluations: {str(e)}")
-
         # Display scores table
         if proposal_scores:
-            import pandas as pd
             df = pd.DataFrame(proposal_scores)
             st.markdown("#### Evaluation Summary")
             st.dataframe(df, use_container_width=True)
 
             # Simple chart
-            if len([p for p in proposal_scores if p['evaluations'] > 0]) > 0:
+            if any(p['evaluations'] > 0 for p in proposal_scores):
                 st.markdown("#### Overall Scores Comparison")
                 chart_data = pd.DataFrame([
                     {'Vendor': p['vendor'], 'Overall Score': p['overall']}
@@ -441,6 +556,27 @@ def show_proposal_details(active_rfps):
         st.info("📋 No active RFPs available for analysis")
 
 
+REPORT_FIELDS = ['evaluator', 'role', 'status', 'functional_score', 'it_security_score', 'business_score',
+                 'overall_score', 'recommendation', 'submitted_at', 'functional_comments', 'it_security_comments',
+                 'business_comments', 'overall_comments']
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _build_evaluation_report(proposal):
+    """Render a proposal's evaluations as CSV bytes"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=REPORT_FIELDS, extrasaction='ignore')
+    writer.writeheader()
+    for evaluation in proposal.get('evaluations') or []:
+        evaluator_info = evaluation.get('user_profiles') or {}
+        writer.writerow({
+            **evaluation,
+            'evaluator': evaluator_info.get('full_name', 'Unknown'),
+            'role': evaluator_info.get('role', 'Unknown')
+        })
+    return buffer.getvalue().encode('utf-8')
+
+
 def show_proposal_evaluations():
     """Show evaluation details for a specific proposal with comprehensive scorecard"""
     if not st.session_state.get('proposal_id'):
@@ -449,245 +585,225 @@ def show_proposal_evaluations():
 
     st.markdown('<h1 class="main-header">📊 Proposal Evaluations</h1>', unsafe_allow_html=True)
 
+    _reap_pending_writes()
+
     db = get_db()
     proposal_id = st.session_state.proposal_id
 
-    # Get proposal details first
+    # Proposal, vendor and evaluations come back from a single query; only the load is
+    # guarded so st.rerun() and programming errors aren't swallowed
     try:
-        # We need to get the proposal details - for now we'll get evaluations and work backwards
-        evaluations = db.get_evaluations_for_proposal(proposal_id)
-
-        if not evaluations:
-            st.info("📭 No evaluations submitted yet")
-            if st.button("← Back to Proposals"):
-                st.session_state.page = 'proposals'
-                st.session_state.proposal_id = None
-                st.rerun()
-            return
-
-        # Get basic proposal info from first evaluation (we need to improve this)
-        # For now, let's create a comprehensive view with what we have
-
-        # Calculate aggregated scores
-        completed_evaluations = [e for e in evaluations if e.get('status') == 'completed']
-
-        if completed_evaluations:
-            # Calculate averages
-            avg_functional = sum(e.get('functional_score', 0) for e in completed_evaluations) / len(
-                completed_evaluations)
-            avg_security = sum(e.get('it_security_score', 0) for e in completed_evaluations) / len(
-                completed_evaluations)
-            avg_business = sum(e.get('business_score', 0) for e in completed_evaluations) / len(completed_evaluations)
-            avg_overall = sum(e.get('overall_score', 0) for e in completed_evaluations) / len(completed_evaluations)
-
-            # Count recommendations
-            recommend_count = sum(1 for e in completed_evaluations if e.get('recommendation') == 'recommend')
-            conditional_count = sum(1 for e in completed_evaluations if e.get('recommendation') == 'conditional')
-            not_recommend_count = sum(1 for e in completed_evaluations if e.get('recommendation') == 'not_recommend')
-
-            # Show comprehensive scorecard
-            st.markdown("### 🏆 Proposal Scorecard")
+        proposal = cached_proposal_with_evaluations(proposal_id) or {}
+    except DB_ERRORS as e:
+        st.error(f"Error loading evaluations: {str(e)}")
+        if st.button("← Back to Proposals"):
+            st.session_state.page = 'proposals'
+            st.session_state.proposal_id = None
+            st.rerun()
+        return
 
-            # Overall summary cards
-            col1, col2, col3, col4 = st.columns(4)
-            with col1:
-                st.metric("Overall Score", f"{avg_overall:.1f}/100",
-                          delta=f"{avg_overall - 50:.1f}" if avg_overall > 50 else f"{avg_overall - 50:.1f}")
-            with col2:
-                total_evaluations = len(completed_evaluations)
-                st.metric("Completed Evaluations", f"{total_evaluations}/{len(evaluations)}")
-            with col3:
-                recommend_rate = (recommend_count / len(completed_evaluations)) * 100
-                st.metric("Recommendation Rate", f"{recommend_rate:.0f}%")
-            with col4:
-                # Overall status based on scores and recommendations
-                if avg_overall >= 70 and recommend_count > not_recommend_count:
-                    status = "🟢 Strong Candidate"
-                elif avg_overall >= 50 and recommend_count >= not_recommend_count:
-                    status = "🟡 Conditional"
-                else:
-                    status = "🔴 Not Recommended"
+    evaluations = proposal.get('evaluations') or []
 
-                # Fix the logic - if we have more recommends than not recommends, it should be positive
-                if recommend_count > not_recommend_count:
-                    if avg_overall >= 70:
-                        status = "🟢 Strong Candidate"
-                    else:
-                        status = "🟡 Conditional"
-                elif recommend_count == not_recommend_count:
-                    status = "🟡 Conditional"
-                else:
-                    status = "🔴 Not Recommended"
+    if proposal:
+        vendor_name = (proposal.get('vendors') or {}).get('name', 'Unknown Vendor')
+        st.markdown(f"**Vendor:** {vendor_name} | **Status:** {proposal['status'].replace('_', ' ').title()}")
 
-                st.metric("Status", status)
+    if not evaluations:
+        st.info("📭 No evaluations submitted yet")
+        if st.button("← Back to Proposals"):
+            st.session_state.page = 'proposals'
+            st.session_state.proposal_id = None
+            st.rerun()
+        return
 
-            # Detailed score breakdown
-            st.markdown("### 📊 Score Breakdown")
-            col1, col2 = st.columns(2)
+    # Split evaluations once; the scorecard, pending list and approval gate all reuse it
+    completed_evaluations, pending_evaluations = [], []
+    for evaluation in evaluations:
+        if evaluation.get('status') == 'completed':
+            completed_evaluations.append(evaluation)
+        else:
+            pending_evaluations.append(evaluation)
 
-            with col1:
-                st.markdown("#### Average Scores by Category")
-                score_data = {
-                    'Category': ['Functional', 'IT Security', 'Business', 'Overall'],
-                    'Score': [avg_functional, avg_security, avg_business, avg_overall],
-                    'Color': ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728']
-                }
+    if completed_evaluations:
+        # Calculate averages
+        _, (avg_functional, avg_security, avg_business, avg_overall) = average_scores(completed_evaluations)
 
-                # Simple bar chart using Streamlit
-                import pandas as pd
-                df = pd.DataFrame({
-                    'Category': score_data['Category'],
-                    'Score': score_data['Score']
-                })
-                st.bar_chart(df.set_index('Category'))
-
-                # Show detailed breakdown
-                st.markdown("**Detailed Scores:**")
-                st.write(f"🔧 **Functional:** {avg_functional:.1f}/100")
-                st.write(f"🔒 **IT Security:** {avg_security:.1f}/100")
-                st.write(f"💼 **Business:** {avg_business:.1f}/100")
-                st.write(f"🎯 **Overall:** {avg_overall:.1f}/100")
+        # Count recommendations
+        recommendations = Counter(e.get('recommendation') for e in completed_evaluations)
+        recommend_count = recommendations['recommend']
+        conditional_count = recommendations['conditional']
+        not_recommend_count = recommendations['not_recommend']
 
-            with col2:
-                st.markdown("#### Recommendation Summary")
+        # Show comprehensive scorecard
+        st.markdown("### 🏆 Proposal Scorecard")
 
-                # Recommendation pie chart data
-                rec_data = {
-                    'Recommendation': ['Recommend', 'Conditional', 'Not Recommend'],
-                    'Count': [recommend_count, conditional_count, not_recommend_count]
-                }
-                rec_df = pd.DataFrame(rec_data)
-                rec_df = rec_df[rec_df['Count'] > 0]  # Only show non-zero values
-
-                if not rec_df.empty:
-                    st.bar_chart(rec_df.set_index('Recommendation'))
-
-                st.markdown("**Recommendation Breakdown:**")
-                st.write(f"✅ **Recommend:** {recommend_count}")
-                st.write(f"⚠️ **Conditional:** {conditional_count}")
-                st.write(f"❌ **Not Recommend:** {not_recommend_count}")
-
-                # Decision helper
-                st.markdown("**Decision Guidance:**")
-                if recommend_count > not_recommend_count and avg_overall >= 70:
-                    st.success("🎯 **Strong candidate for selection**")
-                elif recommend_count > not_recommend_count and avg_overall >= 50:
-                    st.success("✅ **Good candidate - recommended for selection**")
-                elif recommend_count >= not_recommend_count and avg_overall >= 50:
-                    st.warning("⚠️ **Proceed with caution - review conditions**")
-                else:
-                    st.error("❌ **Consider rejecting or requesting improvements**")
-
-        # Individual evaluations section
-        st.markdown("### 👥 Individual Evaluations")
-
-        if completed_evaluations:
-            for i, evaluation in enumerate(completed_evaluations):
-                evaluator_info = evaluation.get('user_profiles', {})
-
-                with st.expander(
-                        f"📝 Evaluation #{i + 1} by {evaluator_info.get('full_name', 'Unknown')} ({evaluator_info.get('role', 'Unknown')})"):
-                    col1, col2 = st.columns(2)
-
-                    with col1:
-                        st.markdown("**Individual Scores:**")
-                        st.write(f"Functional: {evaluation.get('functional_score', 'Not scored')}/100")
-                        st.write(f"IT Security: {evaluation.get('it_security_score', 'Not scored')}/100")
-                        st.write(f"Business: {evaluation.get('business_score', 'Not scored')}/100")
-                        st.write(f"**Overall: {evaluation.get('overall_score', 'Not scored')}/100**")
-
-                    with col2:
-                        st.markdown("**Recommendation & Status:**")
-                        rec = evaluation.get('recommendation', 'Not provided')
-                        rec_color = {'recommend': 'green', 'conditional': 'orange', 'not_recommend': 'red'}.get(rec,
-                                                                                                                'gray')
-                        st.markdown(
-                            f'<span style="color: {rec_color}; font-weight: bold;">{rec.replace("_", " ").title()}</span>',
-                            unsafe_allow_html=True)
-
-                        status = evaluation.get('status', 'pending')
-                        st.write(f"Status: {status.title()}")
-                        if evaluation.get('submitted_at'):
-                            st.caption(f"Submitted: {format_date(evaluation['submitted_at'])}")
-
-                    # Show comments if available
-                    st.markdown("**Comments:**")
-                    comments_shown = False
-
-                    if evaluation.get('functional_comments'):
-                        st.write(f"**Functional:** {evaluation['functional_comments']}")
-                        comments_shown = True
-                    if evaluation.get('it_security_comments'):
-                        st.write(f"**Security:** {evaluation['it_security_comments']}")
-                        comments_shown = True
-                    if evaluation.get('business_comments'):
-                        st.write(f"**Business:** {evaluation['business_comments']}")
-                        comments_shown = True
-                    if evaluation.get('overall_comments'):
-                        st.write(f"**Overall:** {evaluation['overall_comments']}")
-                        comments_shown = True
-
-                    if not comments_shown:
-                        st.write("No detailed comments provided.")
-
-        # Pending evaluations
-        pending_evaluations = [e for e in evaluations if e.get('status') == 'pending']
-        if pending_evaluations:
-            st.markdown("### ⏳ Pending Evaluations")
-            st.warning(f"⚠️ {len(pending_evaluations)} evaluations still pending completion")
-
-            for evaluation in pending_evaluations:
-                evaluator_info = evaluation.get('user_profiles', {})
-                st.write(f"• {evaluator_info.get('full_name', 'Unknown')} ({evaluator_info.get('role', 'Unknown')})")
-
-        # Action buttons for procurement manager
-        st.markdown("### 🎯 Actions")
+        # Overall summary cards
         col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Overall Score", f"{avg_overall:.1f}/100",
+                      delta=f"{avg_overall - 50:.1f}" if avg_overall > 50 else f"{avg_overall - 50:.1f}")
+        with col2:
+            total_evaluations = len(completed_evaluations)
+            st.metric("Completed Evaluations", f"{total_evaluations}/{len(evaluations)}")
+        with col3:
+            recommend_rate = (recommend_count / len(completed_evaluations)) * 100
+            st.metric("Recommendation Rate", f"{recommend_rate:.0f}%")
+        with col4:
+            # Overall status based on scores and recommendations
+            st.metric("Status", _classify(avg_overall, recommend_count, not_recommend_count))
+
+        # Detailed score breakdown
+        st.markdown("### 📊 Score Breakdown")
+        col1, col2 = st.columns(2)
 
         with col1:
-            if st.button("← Back to Proposals"):
-                st.session_state.page = 'proposals'
-                st.session_state.proposal_id = None
-                st.rerun()
+            st.markdown("#### Average Scores by Category")
+            # Simple bar chart using Streamlit, four rows don't need a DataFrame
+            st.bar_chart({
+                'Category': ['Functional', 'IT Security', 'Business', 'Overall'],
+                'Score': [avg_functional, avg_security, avg_business, avg_overall]
+            }, x='Category', y='Score')
+
+            # Show detailed breakdown
+            st.markdown("**Detailed Scores:**")
+            st.write(f"🔧 **Functional:** {avg_functional:.1f}/100")
+            st.write(f"🔒 **IT Security:** {avg_security:.1f}/100")
+            st.write(f"💼 **Business:** {avg_business:.1f}/100")
+            st.write(f"🎯 **Overall:** {avg_overall:.1f}/100")
 
         with col2:
-            if len(completed_evaluations) == len(evaluations) and len(completed_evaluations) > 0:
-                if st.button("📋 Send for Approval", type="primary"):
-                    # Move proposal to approval workflow
-                    try:
-                        # Get current proposal data to preserve the existing summary
-                        current_proposals = db.get_proposals_for_rfp(
-                            "dummy")  # We need a better way to get proposal by ID
-                        # For now, let's use a simple approach
-                        current_summary = "Proposal ready for approval"
-                        approval_note = "[PENDING_APPROVAL] " + current_summary
-
-                        db.update_proposal(proposal_id, {
-                            "status": "under_review",
-                            "proposal_summary": approval_note
-                        })
-
-                        st.success("🎉 Proposal sent for final approval!")
-                        st.info("Department heads will be notified to review the evaluation results.")
-                        st.rerun()
-                    except Exception as e:
-                        st.error(f"Error sending for approval: {str(e)}")
+            st.markdown("#### Recommendation Summary")
+
+            # Recommendation chart data, only non-zero values
+            rec_data = [(label, count) for label, count in (('Recommend', recommend_count),
+                                                            ('Conditional', conditional_count),
+                                                            ('Not Recommend', not_recommend_count))
+                        if count > 0]
+
+            if rec_data:
+                st.bar_chart({
+                    'Recommendation': [label for label, _ in rec_data],
+                    'Count': [count for _, count in rec_data]
+                }, x='Recommendation', y='Count')
+
+            st.markdown("**Recommendation Breakdown:**")
+            st.write(f"✅ **Recommend:** {recommend_count}")
+            st.write(f"⚠️ **Conditional:** {conditional_count}")
+            st.write(f"❌ **Not Recommend:** {not_recommend_count}")
+
+            # Decision helper
+            st.markdown("**Decision Guidance:**")
+            if recommend_count > not_recommend_count and avg_overall >= 70:
+                st.success("🎯 **Strong candidate for selection**")
+            elif recommend_count > not_recommend_count and avg_overall >= 50:
+                st.success("✅ **Good candidate - recommended for selection**")
+            elif recommend_count >= not_recommend_count and avg_overall >= 50:
+                st.warning("⚠️ **Proceed with caution - review conditions**")
             else:
-                st.info("All evaluations must be completed before sending for approval")
-
-        with col3:
-            # Option to request additional evaluation
-            if st.button("👥 Request More Evaluations"):
-                st.info("Feature to add more evaluators - Coming soon")
-
-        with col4:
-            # Download report option
-            if st.button("📥 Download Report"):
-                st.info("Report download feature - Coming soon")
+                st.error("❌ **Consider rejecting or requesting improvements**")
+
+    # Individual evaluations section
+    st.markdown("### 👥 Individual Evaluations")
+
+    if completed_evaluations:
+        for i, evaluation in enumerate(completed_evaluations):
+            evaluator_info = evaluation.get('user_profiles', {})
+
+            with st.expander(
+                    f"📝 Evaluation #{i + 1} by {evaluator_info.get('full_name', 'Unknown')} ({evaluator_info.get('role', 'Unknown')})"):
+                col1, col2 = st.columns(2)
+
+                with col1:
+                    st.markdown("**Individual Scores:**")
+                    st.write(f"Functional: {evaluation.get('functional_score', 'Not scored')}/100")
+                    st.write(f"IT Security: {evaluation.get('it_security_score', 'Not scored')}/100")
+                    st.write(f"Business: {evaluation.get('business_score', 'Not scored')}/100")
+                    st.write(f"**Overall: {evaluation.get('overall_score', 'Not scored')}/100**")
+
+                with col2:
+                    st.markdown("**Recommendation & Status:**")
+                    rec = evaluation.get('recommendation', 'Not provided')
+                    rec_color = RECOMMENDATION_COLORS.get(rec, 'gray')
+                    st.markdown(
+                        f'<span style="color: {rec_color}; font-weight: bold;">{rec.replace("_", " ").title()}</span>',
+                        unsafe_allow_html=True)
+
+                    status = evaluation.get('status', 'pending')
+                    st.write(f"Status: {status.title()}")
+                    if evaluation.get('submitted_at'):
+                        st.caption(f"Submitted: {format_date(evaluation['submitted_at'])}")
+
+                # Show comments if available
+                st.markdown("**Comments:**")
+                comments_shown = False
+
+                if evaluation.get('functional_comments'):
+                    st.write(f"**Functional:** {evaluation['functional_comments']}")
+                    comments_shown = True
+                if evaluation.get('it_security_comments'):
+                    st.write(f"**Security:** {evaluation['it_security_comments']}")
+                    comments_shown = True
+                if evaluation.get('business_comments'):
+                    st.write(f"**Business:** {evaluation['business_comments']}")
+                    comments_shown = True
+                if evaluation.get('overall_comments'):
+                    st.write(f"**Overall:** {evaluation['overall_comments']}")
+                    comments_shown = True
+
+                if not comments_shown:
+                    st.write("No detailed comments provided.")
+
+    # Pending evaluations
+    if pending_evaluations:
+        st.markdown("### ⏳ Pending Evaluations")
+        st.warning(f"⚠️ {len(pending_evaluations)} evaluations still pending completion")
+
+        for evaluation in pending_evaluations:
+            evaluator_info = evaluation.get('user_profiles', {})
+            st.write(f"• {evaluator_info.get('full_name', 'Unknown')} ({evaluator_info.get('role', 'Unknown')})")
+
+    # Action buttons for procurement manager
+    st.markdown("### 🎯 Actions")
+    col1, col2, col3, col4 = st.columns(4)
 
-    except Exception as e:
-        st.error(f"Error loading evaluations: {str(e)}")
+    with col1:
         if st.button("← Back to Proposals"):
             st.session_state.page = 'proposals'
             st.session_state.proposal_id = None
-            st.rerun()
\ No newline at end of file
+            st.rerun()
+
+    with col2:
+        if st.session_state.get('proposal_status', {}).get(proposal_id) == 'under_review':
+            st.success("📋 Sent for approval")
+        elif not pending_evaluations:
+            approving = st.session_state.setdefault('approving', set())
+            if st.button("📋 Send for Approval", type="primary") and proposal_id not in approving:
+                # Guard against a double-click queueing a second write for the same proposal
+                approving.add(proposal_id)
+
+                # Move proposal to approval workflow. The write runs in the background and
+                # database errors are reported when it is reaped on a later rerun
+                future = _EXECUTOR.submit(db.mark_pending_approval, proposal_id)
+                st.session_state.setdefault('pending_writes', []).append(
+                    ("Send for approval", proposal_id, future))
+
+                # Patch the status in session state instead of replaying the whole page
+                st.session_state.setdefault('proposal_status', {})[proposal_id] = 'under_review'
+                st.success("🎉 Proposal sent for final approval!")
+                st.info("Department heads will be notified to review the evaluation results.")
+        else:
+            st.info("All evaluations must be completed before sending for approval")
+
+    with col3:
+        # Option to request additional evaluation
+        if st.button("👥 Request More Evaluations"):
+            st.info("Feature to add more evaluators - Coming soon")
+
+    with col4:
+        # Download report option, built once per version of the evaluations
+        st.download_button(
+            "📥 Download Report",
+            data=_build_evaluation_report(proposal),
+            file_name=f"proposal_{proposal_id}_evaluations.csv",
+            mime="text/csv"
+        )
@@ -1,8 +1,18 @@
 import streamlit as st
 import json
 import uuid
+import functools
+from collections import Counter
 from datetime import datetime, timedelta
-from config import get_db, get_ai, format_date
+from config import (get_db, get_ai, format_date, status_badge, cached_rfp_templates, cached_rfp_by_id,
+                    cached_team_members, cached_users_by_id, cached_proposals_for_rfps,
+                    cached_evaluation_summary_for_rfp, clear_rfp_caches)
+
+
+@functools.lru_cache(maxsize=256)
+def _iso_to_date(date_str):
+    """Parse an ISO timestamp from the database into a date"""
+    return datetime.fromisoformat(date_str.replace('Z', '+00:00')).date()
 
 
 def show_create_rfp_page():
@@ -13,11 +23,11 @@ def show_create_rfp_page():
     ai = get_ai()
 
     # Get RFP templates
-    templates = db.get_rfp_templates()
+    templates = cached_rfp_templates()
     template_options = {t['name']: t for t in templates}
     template_options['Custom (No Template)'] = None
 
-    with st.form(f"create_rfp_form_{hash(str(st.session_state.user.id))}", clear_on_submit=False):
+    with st.form(f"create_rfp_form_{st.session_state.user.id}", clear_on_submit=False):
         col1, col2 = st.columns([2, 1])
 
         with col1:
@@ -113,11 +123,22 @@ def show_create_rfp_page():
                     }
                 }
 
-                # Generate content
+                # Generate content, streaming it onto the page as it arrives
                 with st.spinner("🤖 Generating RFP content..."):
                     if use_ai:
                         template_content = selected_template['template_content'] if selected_template else None
-                        rfp_content = ai.generate_rfp_content(title, description, template_content, business_criteria)
+                        preview = st.empty()
+                        rfp_content = ""
+                        try:
+                            for chunk in ai.stream_rfp_content(title, description, template_content,
+                                                               business_criteria):
+                                rfp_content += chunk
+                                preview.markdown(rfp_content)
+                        except Exception as e:
+                            st.error(f"Error generating RFP content: {str(e)}")
+                            if rfp_content:
+                                # Keep what arrived, but don't save a cut-off draft as if it were complete
+                                rfp_content += "\n\n[AI generation stopped early - please review and complete manually]"
                         if not rfp_content:
                             rfp_content = f"# {title}\n\n{description}\n\n[AI generation failed - please edit manually]"
                     else:
@@ -139,6 +160,7 @@ def show_create_rfp_page():
                 try:
                     new_rfp = db.create_rfp(rfp_data)
                     if new_rfp:
+                        clear_rfp_caches()
                         st.success("🎉 RFP created successfully!")
                         st.session_state.rfp_id = new_rfp['id']
                         st.session_state.page = 'view_rfp'
@@ -158,7 +180,7 @@ def show_edit_rfp_page():
     st.markdown('<h1 class="main-header">✏️ Edit RFP</h1>', unsafe_allow_html=True)
 
     db = get_db()
-    rfp = db.get_rfp_by_id(st.session_state.rfp_id)
+    rfp = cached_rfp_by_id(st.session_state.rfp_id)
 
     if not rfp:
         st.error("RFP not found")
@@ -185,8 +207,7 @@ def show_edit_rfp_page():
 
         with col2:
             st.markdown("### Timeline")
-            current_due_date = datetime.fromisoformat(rfp['due_date'].replace('Z', '+00:00')).date() if rfp[
-                'due_date'] else datetime.now().date()
+            current_due_date = _iso_to_date(rfp['due_date']) if rfp['due_date'] else datetime.now().date()
             due_date = st.date_input("Proposal Due Date", value=current_due_date)
 
         # Content editing
@@ -291,6 +312,7 @@ def show_edit_rfp_page():
                 try:
                     updated_rfp = db.update_rfp(st.session_state.rfp_id, updates)
                     if updated_rfp:
+                        clear_rfp_caches()
                         if submit_for_approval:
                             st.success("🎉 RFP submitted for approval!")
                         else:
@@ -307,41 +329,22 @@ def show_view_rfp_page():
     """View RFP details and manage team/proposals"""
     if not st.session_state.rfp_id:
         st.error("No RFP selected")
-        st.write("Debug: RFP ID missing")
         return
 
-    st.write(f"Debug: Loading RFP {st.session_state.rfp_id}")
-
     db = get_db()
-    rfp = db.get_rfp_by_id(st.session_state.rfp_id)
+    rfp = cached_rfp_by_id(st.session_state.rfp_id)
 
     if not rfp:
         st.error("RFP not found")
-        st.write(f"Debug: Could not find RFP with ID {st.session_state.rfp_id}")
         return
 
-    st.write(f"Debug: RFP loaded successfully - {rfp['title']}")
-
     # Header
     col1, col2, col3 = st.columns([3, 1, 1])
     with col1:
         st.markdown(f'<h1 class="main-header">📄 {rfp["title"]}</h1>', unsafe_allow_html=True)
 
     with col2:
-        status_color = {
-            'draft': 'gray',
-            'pending_approval': 'orange',
-            'approved': 'blue',
-            'published': 'green',
-            'evaluation': 'purple',
-            'completed': 'darkgreen',
-            'cancelled': 'red'
-        }.get(rfp['status'], 'gray')
-
-        st.markdown(
-            f'<span class="status-badge" style="background-color: {status_color};">{rfp["status"].replace("_", " ").title()}</span>',
-            unsafe_allow_html=True
-        )
+        st.markdown(status_badge(rfp['status']), unsafe_allow_html=True)
 
     with col3:
         # Back button
@@ -362,26 +365,22 @@ def show_view_rfp_page():
             if st.button("📢 Publish RFP"):
                 updates = {"status": "published"}
                 db.update_rfp(st.session_state.rfp_id, updates)
+                clear_rfp_caches()
                 st.success("RFP published!")
                 st.rerun()
 
-    # Tabs for different sections
-    tab1, tab2, tab3, tab4, tab5 = st.tabs(["📋 Details", "👥 Team", "🏢 Proposals", "📊 Evaluations", "📈 Analytics"])
-
-    with tab1:
-        show_rfp_details(rfp)
-
-    with tab2:
-        show_rfp_team_management(rfp)
-
-    with tab3:
-        show_rfp_proposals(rfp)
-
-    with tab4:
-        show_rfp_evaluations(rfp)
-
-    with tab5:
-        show_rfp_analytics(rfp)
+    # Section switcher: unlike st.tabs, only the selected section is rendered (and queried) on each rerun.
+    # The selection lives in session_state under the widget key, so reruns keep the current section.
+    sections = {
+        "📋 Details": show_rfp_details,
+        "👥 Team": show_rfp_team_management,
+        "🏢 Proposals": show_rfp_proposals,
+        "📊 Evaluations": show_rfp_evaluations,
+        "📈 Analytics": show_rfp_analytics
+    }
+    active_section = st.radio("Section", list(sections), horizontal=True, key='rfp_tab',
+                              label_visibility="collapsed")
+    sections[active_section](rfp)
 
 
 def show_rfp_details(rfp):
@@ -429,28 +428,37 @@ def show_rfp_team_management(rfp):
 
     # Get current team members
     try:
-        team_members = db.get_team_members(st.session_state.rfp_id)
+        team_members = cached_team_members(st.session_state.rfp_id)
     except Exception as e:
         st.error(f"Error loading team members: {str(e)}")
         team_members = []
 
     if team_members:
-        for member in team_members:
-            col1, col2, col3, col4 = st.columns([2, 1, 1, 1])
+        # One table instead of a row of columns and buttons per member
+        st.dataframe([
+            {
+                "Name": (member.get('user_profiles') or {}).get('full_name', 'Unknown'),
+                "Email": (member.get('user_profiles') or {}).get('email', ''),
+                "User Role": (member.get('user_profiles') or {}).get('role', 'Unknown').replace('_', ' ').title(),
+                "Team Role": member.get('role', 'evaluator').title()
+            }
+            for member in team_members
+        ], hide_index=True, use_container_width=True)
+
+        if user_is_creator:
+            col1, col2 = st.columns([3, 1])
             with col1:
-                user_info = member.get('user_profiles', {})
-                st.write(f"**{user_info.get('full_name', 'Unknown')}**")
-                st.caption(user_info.get('email', ''))
+                member_index = st.selectbox(
+                    "Team member", range(len(team_members)),
+                    format_func=lambda i: (team_members[i].get('user_profiles') or {}).get('full_name', 'Unknown'),
+                    key=f"remove_member_{st.session_state.rfp_id}"
+                )
             with col2:
-                st.write(user_info.get('role', 'Unknown').replace('_', ' ').title())
-            with col3:
-                st.write(member.get('role', 'evaluator').title())
-            with col4:
-                if user_is_creator:
-                    if st.button("Remove", key=f"remove_{member['user_id']}"):
-                        db.remove_team_member(st.session_state.rfp_id, member['user_id'])
-                        st.success("Team member removed")
-                        st.rerun()
+                if st.button("Remove", key=f"remove_member_button_{st.session_state.rfp_id}"):
+                    db.remove_team_member(st.session_state.rfp_id, team_members[member_index]['user_id'])
+                    cached_team_members.clear()
+                    st.success("Team member removed")
+                    st.rerun()
     else:
         st.info("No team members added yet")
 
@@ -460,16 +468,17 @@ def show_rfp_team_management(rfp):
 
         # Get all users
         try:
-            all_users = db.get_all_users()
+            users_by_id = cached_users_by_id()
         except Exception as e:
             st.error(f"Error loading users: {str(e)}")
-            all_users = []
+            users_by_id = {}
 
         # Exclude creator and existing team members
         existing_member_ids = {m['user_id'] for m in team_members}
         existing_member_ids.add(rfp['created_by'])
 
-        available_users = [u for u in all_users if u['id'] not in existing_member_ids]
+        available_users = sorted((users_by_id[user_id] for user_id in users_by_id.keys() - existing_member_ids),
+                                 key=lambda u: u.get('full_name') or '')
 
         if available_users:
             with st.form(f"add_team_member_{st.session_state.rfp_id}"):
@@ -492,6 +501,7 @@ def show_rfp_team_management(rfp):
                     try:
                         new_member = db.add_team_member(team_data)
                         if new_member:
+                            cached_team_members.clear()
                             st.success("Team member added!")
                             st.rerun()
                         else:
@@ -528,19 +538,13 @@ def show_rfp_team_management(rfp):
                         }
                     ]
 
-                    created_count = 0
+                    # Create user profiles directly (since we can't create auth users without passwords)
                     for user_data in sample_users:
-                        try:
-                            # Create user profile directly (since we can't create auth users without passwords)
-                            import uuid
-                            user_data["id"] = str(uuid.uuid4())
-                            new_user = db.create_user_profile(user_data)
-                            if new_user:
-                                created_count += 1
-                        except Exception as e:
-                            st.error(f"Error creating user {user_data['full_name']}: {str(e)}")
+                        user_data["id"] = str(uuid.uuid4())
+                    created_count = len(db.create_user_profiles_bulk(sample_users))
 
                     if created_count > 0:
+                        cached_users_by_id.clear()
                         st.success(f"✅ Created {created_count} sample users! Refresh to see them.")
                         st.rerun()
                     else:
@@ -554,6 +558,7 @@ def show_rfp_team_management(rfp):
                 if st.button("📢 Publish RFP Without Team"):
                     try:
                         db.update_rfp(st.session_state.rfp_id, {"status": "published"})
+                        clear_rfp_caches()
                         st.success("🎉 RFP published! You can add team members later.")
                         st.rerun()
                     except Exception as e:
@@ -568,77 +573,59 @@ def show_rfp_proposals(rfp):
     """Show proposals tab"""
     st.markdown("### 📥 Proposals")
 
-    db = get_db()
     rfp_id = rfp['id']
 
     try:
-        proposals = db.get_proposals_for_rfp(rfp_id)
+        proposals = cached_proposals_for_rfps((rfp_id,))
     except Exception as e:
         st.error(f"Error loading proposals: {str(e)}")
         proposals = []
 
     if proposals:
         # Proposals summary
+        status_counts = Counter(p['status'] for p in proposals)
         col1, col2, col3, col4 = st.columns(4)
 
         with col1:
             st.metric("Total Proposals", len(proposals))
 
         with col2:
-            submitted = len([p for p in proposals if p['status'] == 'submitted'])
-            st.metric("New Submissions", submitted)
+            st.metric("New Submissions", status_counts['submitted'])
 
         with col3:
-            shortlisted = len([p for p in proposals if p['status'] == 'shortlisted'])
-            st.metric("Shortlisted", shortlisted)
+            st.metric("Shortlisted", status_counts['shortlisted'])
 
         with col4:
-            under_review = len([p for p in proposals if p['status'] == 'under_review'])
-            st.metric("Under Review", under_review)
+            st.metric("Under Review", status_counts['under_review'])
 
-        # Proposals list
+        # Proposals list, as one table rather than a row of widgets per proposal
+        proposal_rows = []
         for proposal in proposals:
-            with st.container():
-                col1, col2, col3, col4 = st.columns([3, 1, 1, 1])
-
-                with col1:
-                    vendor_info = proposal.get('vendors', {})
-                    st.markdown(f"**{vendor_info.get('name', 'Unknown Vendor')}**")
-                    st.write(f"📧 {vendor_info.get('contact_email', 'No email')}")
-                    if proposal.get('proposal_summary'):
-                        st.caption(proposal['proposal_summary'][:100] + "...")
-
-                with col2:
-                    status = proposal['status']
-                    status_color = {
-                        'submitted': 'blue',
-                        'under_review': 'orange',
-                        'shortlisted': 'green',
-                        'rejected': 'red'
-                    }.get(status, 'gray')
-
-                    st.markdown(
-                        f'<span class="status-badge" style="background-color: {status_color};">{status.replace("_", " ").title()}</span>',
-                        unsafe_allow_html=True
-                    )
-
-                with col3:
-                    # Count evaluations
-                    try:
-                        evaluations = db.get_evaluations_for_proposal(proposal['id'])
-                        completed = len([e for e in evaluations if e.get('status') == 'completed'])
-                        total = len(evaluations)
-                        st.write(f"📊 {completed}/{total} evals")
-                    except:
-                        st.write("📊 0/0 evals")
-
-                with col4:
-                    if st.button("View", key=f"view_proposal_{proposal['id']}"):
-                        st.session_state.proposal_id = proposal['id']
-                        st.session_state.page = 'proposal_evaluations'
-                        st.rerun()
-
-                st.markdown("---")
+            vendor_info = proposal.get('vendors') or {}
+            evaluations = proposal.get('evaluations') or []
+            completed = sum(1 for e in evaluations if e.get('status') == 'completed')
+            summary = proposal.get('proposal_summary') or ''
+            proposal_rows.append({
+                "Vendor": vendor_info.get('name', 'Unknown Vendor'),
+                "Contact": vendor_info.get('contact_email', 'No email'),
+                "Status": proposal['status'].replace('_', ' ').title(),
+                "Evaluations": f"{completed}/{len(evaluations)}",
+                "Summary": summary[:100] + "..." if len(summary) > 100 else summary
+            })
+        st.dataframe(proposal_rows, hide_index=True, use_container_width=True)
+
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            proposal_index = st.selectbox(
+                "Proposal", range(len(proposals)),
+                format_func=lambda i: f"{proposal_rows[i]['Vendor']} ({proposal_rows[i]['Status']})",
+                key=f"rfp_proposal_{rfp_id}"
+            )
+        with col2:
+            if st.button("View Evaluations", key=f"view_proposal_{rfp_id}"):
+                st.session_state.proposal_id = proposals[proposal_index]['id']
+                st.session_state.page = 'proposal_evaluations'
+                st.rerun()
     else:
         st.info("📭 No proposals submitted yet")
 
@@ -648,45 +635,58 @@ def show_rfp_proposals(rfp):
             st.rerun()
 
 
+def _vendor_evaluation_summary(proposals):
+    """Summarize embedded evaluations per vendor, matching the rfp_evaluation_summary function"""
+    import pandas as pd
+
+    rows = []
+    for proposal in proposals:
+        vendor = (proposal.get('vendors') or {}).get('name', 'Unknown')
+        # Every proposal contributes an empty row so vendors without evaluations are still listed
+        rows.append({'vendor': vendor, 'completed': 0, 'pending': 0, 'overall_score': None, 'recommended': False})
+        for evaluation in proposal.get('evaluations') or []:
+            completed = evaluation.get('status') == 'completed'
+            rows.append({
+                'vendor': vendor,
+                'completed': int(completed),
+                'pending': int(not completed),
+                'overall_score': (evaluation.get('overall_score') or 0) if completed else None,
+                'recommended': completed and evaluation.get('recommendation') == 'recommend'
+            })
+
+    df = pd.DataFrame(rows)
+    df['overall_score'] = pd.to_numeric(df['overall_score'])
+    summary = df.groupby('vendor', sort=False).agg(
+        avg_score=('overall_score', 'mean'),
+        recommend_count=('recommended', 'sum'),
+        completed=('completed', 'sum'),
+        pending=('pending', 'sum')
+    )
+    return summary.fillna({'avg_score': 0}).reset_index().to_dict('records')
+
+
 def show_rfp_evaluations(rfp):
     """Show evaluations tab"""
     st.markdown("### 📊 Evaluations Overview")
 
-    db = get_db()
     rfp_id = rfp['id']
 
     try:
-        proposals = db.get_proposals_for_rfp(rfp_id)
-
-        if not proposals:
+        # Per-vendor counts and averages come from Postgres when the summary function is
+        # installed, otherwise they're aggregated from the embedded evaluations
+        vendor_summary = cached_evaluation_summary_for_rfp(rfp_id)
+        if vendor_summary is None:
+            proposals = cached_proposals_for_rfps((rfp_id,))
+            vendor_summary = _vendor_evaluation_summary(proposals) if proposals else []
+
+        if not vendor_summary:
             st.info("📭 No proposals to evaluate yet")
             return
 
         # Evaluation summary
-        total_evaluations = 0
-        completed_evaluations = 0
-        pending_evaluations = 0
-
-        evaluation_data = []
-
-        for proposal in proposals:
-            try:
-                evaluations = db.get_evaluations_for_proposal(proposal['id'])
-                total_evaluations += len(evaluations)
-
-                for evaluation in evaluations:
-                    if evaluation.get('status') == 'completed':
-                        completed_evaluations += 1
-                        evaluation_data.append({
-                            'vendor': proposal.get('vendors', {}).get('name', 'Unknown'),
-                            'evaluator': evaluation.get('user_profiles', {}).get('full_name', 'Unknown'),
-                            'overall_score': evaluation.get('overall_score', 0),
-                            'recommendation': evaluation.get('recommendation', 'not_recommend')
-                        })
-                    else:
-                        pending_evaluations += 1
-            except:
-                continue
+        completed_evaluations = sum(row['completed'] for row in vendor_summary)
+        pending_evaluations = sum(row['pending'] for row in vendor_summary)
+        total_evaluations = completed_evaluations + pending_evaluations
 
         # Summary metrics
         col1, col2, col3, col4 = st.columns(4)
@@ -706,34 +706,23 @@ def show_rfp_evaluations(rfp):
             st.metric("Completion Rate", f"{completion_rate}%")
 
         # Evaluation results
-        if evaluation_data:
+        if completed_evaluations:
             st.markdown("#### Evaluation Results")
 
-            # Group by vendor
-            vendor_scores = {}
-            for eval_item in evaluation_data:
-                vendor = eval_item['vendor']
-                if vendor not in vendor_scores:
-                    vendor_scores[vendor] = {'scores': [], 'recommendations': []}
-
-                vendor_scores[vendor]['scores'].append(eval_item['overall_score'])
-                vendor_scores[vendor]['recommendations'].append(eval_item['recommendation'])
-
             # Display vendor summary
-            for vendor, data in vendor_scores.items():
+            for row in vendor_summary:
+                if not row['completed']:
+                    continue
                 col1, col2, col3 = st.columns([2, 1, 1])
 
                 with col1:
-                    st.markdown(f"**{vendor}**")
+                    st.markdown(f"**{row['vendor']}**")
 
                 with col2:
-                    avg_score = sum(data['scores']) / len(data['scores']) if data['scores'] else 0
-                    st.metric("Avg Score", f"{round(avg_score, 1)}/100")
+                    st.metric("Avg Score", f"{round(row['avg_score'], 1)}/100")
 
                 with col3:
-                    recommend_count = data['recommendations'].count('recommend')
-                    total_evals = len(data['recommendations'])
-                    st.write(f"👍 {recommend_count}/{total_evals} recommend")
+                    st.write(f"👍 {row['recommend_count']}/{row['completed']} recommend")
         else:
             st.info("📊 No completed evaluations yet")
 
@@ -1,7 +1,14 @@
 import streamlit as st
-from config import get_db, format_date
+from config import get_db, format_date, cached_evaluation, clear_proposal_caches, RECOMMENDATION_OPTIONS
 from datetime import datetime
 
+# Display labels for config.RECOMMENDATION_OPTIONS
+RECOMMENDATION_LABELS = {
+    "recommend": "✅ Recommend",
+    "conditional": "⚠️ Conditional",
+    "not_recommend": "❌ Not Recommend"
+}
+
 
 def show_simple_evaluate_proposal_page():
     """Simplified proposal evaluation form - minimal working version"""
@@ -18,7 +25,7 @@ def show_simple_evaluate_proposal_page():
 
     # Get evaluation details
     try:
-        evaluation = db.get_evaluation(proposal_id, st.session_state.user.id)
+        evaluation = cached_evaluation(proposal_id, st.session_state.user.id)
         if not evaluation:
             st.error("Evaluation not found")
             return
@@ -71,7 +78,7 @@ def show_simple_evaluate_proposal_page():
         st.markdown("#### 🎯 Overall Assessment")
 
         # Calculate simple average
-        calculated_overall = int((functional_score + security_score + business_score) / 3)
+        calculated_overall = (functional_score + security_score + business_score) // 3
 
         col1, col2 = st.columns(2)
 
@@ -80,24 +87,16 @@ def show_simple_evaluate_proposal_page():
             overall_score = st.slider("Final Overall Score", 0, 100, calculated_overall)
 
             # Simple recommendation dropdown
-            recommendation_options = ["recommend", "conditional", "not_recommend"]
-            try:
-                if existing_recommendation in recommendation_options:
-                    rec_index = recommendation_options.index(existing_recommendation)
-                else:
-                    rec_index = 0
-            except:
+            if existing_recommendation in RECOMMENDATION_OPTIONS:
+                rec_index = RECOMMENDATION_OPTIONS.index(existing_recommendation)
+            else:
                 rec_index = 0
 
             recommendation = st.selectbox(
                 "Recommendation",
-                recommendation_options,
+                RECOMMENDATION_OPTIONS,
                 index=rec_index,
-                format_func=lambda x: {
-                    "recommend": "✅ Recommend",
-                    "conditional": "⚠️ Conditional",
-                    "not_recommend": "❌ Not Recommend"
-                }.get(x, x)
+                format_func=lambda x: RECOMMENDATION_LABELS.get(x, x)
             )
 
         with col2:
@@ -149,17 +148,15 @@ def show_simple_evaluate_proposal_page():
 
             # Update evaluation
             try:
-                updated_evaluation = db.update_evaluation(evaluation_id, evaluation_updates)
+                if submit_evaluation:
+                    # Also moves the proposal to under review, atomically when submit_evaluation_tx is installed
+                    updated_evaluation = db.submit_evaluation(evaluation_id, proposal_id, evaluation_updates)
+                else:
+                    updated_evaluation = db.update_evaluation(evaluation_id, evaluation_updates)
                 if updated_evaluation:
+                    clear_proposal_caches()
                     if submit_evaluation:
                         st.success("🎉 Evaluation submitted successfully!")
-
-                        # Update proposal status
-                        try:
-                            db.update_proposal(proposal_id, {"status": "under_review"})
-                        except:
-                            pass  # Don't fail if this doesn't work
-
                     else:
                         st.success("💾 Evaluation draft saved!")
 
@@ -0,0 +1,128 @@
+-- Optional views, functions and indexes used by the app.
+-- Run this in the Supabase SQL editor after the main schema. Everything here is
+-- optional: the app falls back to client-side queries when an object is missing.
+
+
+-- Average evaluation scores per proposal (Proposals > Detailed Analysis)
+CREATE OR REPLACE VIEW proposal_score_summary
+WITH (security_invoker = true) AS
+SELECT
+    p.id AS proposal_id,
+    p.rfp_id,
+    p.status,
+    COALESCE(v.name, 'Unknown') AS vendor,
+    COALESCE(AVG(COALESCE(e.functional_score, 0)) FILTER (WHERE e.status = 'completed'), 0)::float AS functional,
+    COALESCE(AVG(COALESCE(e.it_security_score, 0)) FILTER (WHERE e.status = 'completed'), 0)::float AS security,
+    COALESCE(AVG(COALESCE(e.business_score, 0)) FILTER (WHERE e.status = 'completed'), 0)::float AS business,
+    COALESCE(AVG(COALESCE(e.overall_score, 0)) FILTER (WHERE e.status = 'completed'), 0)::float AS overall,
+    COUNT(e.id) FILTER (WHERE e.status = 'completed') AS evaluations
+FROM proposals p
+LEFT JOIN vendors v ON v.id = p.vendor_id
+LEFT JOIN evaluations e ON e.proposal_id = p.id
+GROUP BY p.id, v.name;
+
+CREATE INDEX IF NOT EXISTS idx_evaluations_proposal_id ON evaluations (proposal_id);
+CREATE INDEX IF NOT EXISTS idx_proposals_rfp_id ON proposals (rfp_id);
+
+
+-- Send a proposal for department head approval in one statement (Proposal Evaluations page).
+-- The row lock taken by UPDATE serializes double-clicks; the prefix check makes the repeat a no-op.
+CREATE OR REPLACE FUNCTION mark_pending_approval(p_proposal_id uuid)
+RETURNS SETOF proposals
+LANGUAGE sql
+AS $$
+    UPDATE proposals
+    SET status = 'under_review',
+        proposal_summary = '[PENDING_APPROVAL] ' || COALESCE(proposal_summary, '')
+    WHERE id = p_proposal_id
+      AND COALESCE(proposal_summary, '') NOT LIKE '[PENDING_APPROVAL]%'
+    RETURNING *;
+$$;
+
+
+-- Evaluation counts and average overall score per vendor for one RFP (RFP > Evaluations tab)
+CREATE OR REPLACE FUNCTION rfp_evaluation_summary(p_rfp_id uuid)
+RETURNS TABLE (vendor text, avg_score float, recommend_count bigint, completed bigint, pending bigint)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT
+        COALESCE(v.name, 'Unknown') AS vendor,
+        COALESCE(AVG(COALESCE(e.overall_score, 0)) FILTER (WHERE e.status = 'completed'), 0)::float AS avg_score,
+        COUNT(*) FILTER (WHERE e.status = 'completed' AND e.recommendation = 'recommend') AS recommend_count,
+        COUNT(*) FILTER (WHERE e.status = 'completed') AS completed,
+        COUNT(e.id) FILTER (WHERE e.status IS DISTINCT FROM 'completed') AS pending
+    FROM proposals p
+    LEFT JOIN vendors v ON v.id = p.vendor_id
+    LEFT JOIN evaluations e ON e.proposal_id = p.id
+    WHERE p.rfp_id = p_rfp_id
+    GROUP BY COALESCE(v.name, 'Unknown')
+    ORDER BY 1;
+$$;
+
+
+-- Trigram indexes so the vendor search (name/contact_email ILIKE '%term%') can use an index
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX IF NOT EXISTS idx_vendors_name_trgm ON vendors USING gin (name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_vendors_contact_email_trgm ON vendors USING gin (contact_email gin_trgm_ops);
+
+
+-- Probe several tables in one call (test_database.py). Runs with the caller's rights, so RLS applies.
+CREATE OR REPLACE FUNCTION check_tables(names text[])
+RETURNS TABLE (table_name text, ok boolean, rowcount integer, error text)
+LANGUAGE plpgsql
+STABLE
+AS $$
+DECLARE
+    t text;
+BEGIN
+    FOREACH t IN ARRAY names LOOP
+        table_name := t;
+        BEGIN
+            EXECUTE format('SELECT count(*) FROM (SELECT 1 FROM %I LIMIT 1) AS probe', t) INTO rowcount;
+            ok := true;
+            error := NULL;
+        EXCEPTION WHEN OTHERS THEN
+            ok := false;
+            rowcount := 0;
+            error := SQLERRM;
+        END;
+        RETURN NEXT;
+    END LOOP;
+END;
+$$;
+
+
+-- Save a final evaluation and move its proposal to under review in one transaction (evaluation pages).
+-- Keys missing from p_updates keep their current values.
+CREATE OR REPLACE FUNCTION submit_evaluation_tx(p_evaluation_id uuid, p_proposal_id uuid, p_updates jsonb)
+RETURNS SETOF evaluations
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    updated evaluations;
+BEGIN
+    UPDATE evaluations e
+    SET (functional_score, functional_comments, it_security_score, it_security_comments,
+         business_score, business_comments, overall_score, overall_comments,
+         recommendation, status, submitted_at) =
+        (SELECT r.functional_score, r.functional_comments, r.it_security_score, r.it_security_comments,
+                r.business_score, r.business_comments, r.overall_score, r.overall_comments,
+                r.recommendation, r.status, r.submitted_at
+         FROM jsonb_populate_record(e, p_updates) AS r)
+    WHERE e.id = p_evaluation_id
+    RETURNING e.* INTO updated;
+
+    IF NOT FOUND THEN
+        RETURN;
+    END IF;
+
+    UPDATE proposals SET status = 'under_review' WHERE id = p_proposal_id;
+    RETURN NEXT updated;
+END;
+$$;
+
+
+-- One evaluation per evaluator per proposal; also serves the get_evaluation lookup.
+-- Remove any duplicate (proposal_id, evaluator_id) rows before creating it.
+CREATE UNIQUE INDEX IF NOT EXISTS idx_evaluations_proposal_evaluator ON evaluations (proposal_id, evaluator_id);
@@ -5,6 +5,8 @@ Run this to verify your database setup is working
 """
 
 import os
+import asyncio
+import httpx
 from dotenv import load_dotenv
 from supabase import create_client
 
@@ -12,6 +14,23 @@ from supabase import create_client
 load_dotenv()
 
 
+async def _probe_table(client, table):
+    """Fetch at most one row from a table through the REST API"""
+    try:
+        response = await client.get(f"/rest/v1/{table}", params={"select": "*", "limit": 1})
+        response.raise_for_status()
+        return table, len(response.json()), None
+    except Exception as e:
+        return table, 0, e
+
+
+async def probe_tables(url, key, tables):
+    """Probe all tables concurrently over one HTTP client"""
+    headers = {"apikey": key, "Authorization": f"Bearer {key}"}
+    async with httpx.AsyncClient(base_url=url, headers=headers) as client:
+        return await asyncio.gather(*[_probe_table(client, table) for table in tables])
+
+
 def test_database_connection():
     """Test basic database connection and queries"""
 
@@ -39,12 +58,21 @@ def test_database_connection():
             "rfp_templates"
         ]
 
-        for table in tables_to_check:
-            try:
-                response = supabase.table(table).select("*").limit(1).execute()
-                print(f"✅ {table}: OK ({len(response.data)} rows visible)")
-            except Exception as e:
-                print(f"❌ {table}: Error - {str(e)}")
+        try:
+            # One round trip for all tables (check_tables is defined in supabase_functions.sql)
+            response = supabase.rpc("check_tables", {"names": tables_to_check}).execute()
+            for row in response.data:
+                if row["ok"]:
+                    print(f"✅ {row['table_name']}: OK ({row['rowcount']} rows visible)")
+                else:
+                    print(f"❌ {row['table_name']}: Error - {row['error']}")
+        except Exception:
+            # check_tables not installed: probe the tables concurrently instead
+            for table, rowcount, error in asyncio.run(probe_tables(SUPABASE_URL, SUPABASE_KEY, tables_to_check)):
+                if error is None:
+                    print(f"✅ {table}: OK ({rowcount} rows visible)")
+                else:
+                    print(f"❌ {table}: Error - {str(error)}")
 
         # Test 2: Check user profiles
         print("\n👤 Testing user profiles...")
@@ -1,4 +1,6 @@
 import streamlit as st
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from config import get_db, format_date
 
 
@@ -35,8 +37,8 @@ def show_test_workflow():
                 rfps = db.get_rfps_for_user(user_id)
                 st.success(f"✅ Found {len(rfps)} RFPs")
                 if rfps:
-                    for rfp in rfps[:3]:
-                        st.write(f"- {rfp['title']} ({rfp['status']})")
+                    st.dataframe(pd.DataFrame(rfps, columns=['title', 'status']), use_container_width=True,
+                                 hide_index=True)
             except Exception as e:
                 st.error(f"❌ RFPs Query Failed: {str(e)}")
 
@@ -45,8 +47,9 @@ def show_test_workflow():
             try:
                 users = db.get_all_users()
                 st.success(f"✅ Found {len(users)} users")
-                for user in users[:3]:
-                    st.write(f"- {user['full_name']} ({user['role']})")
+                if users:
+                    st.dataframe(pd.DataFrame(users, columns=['full_name', 'role']), use_container_width=True,
+                                 hide_index=True)
             except Exception as e:
                 st.error(f"❌ Users Query Failed: {str(e)}")
 
@@ -54,8 +57,9 @@ def show_test_workflow():
         try:
             vendors = db.get_all_vendors()
             st.success(f"✅ Found {len(vendors)} vendors")
-            for vendor in vendors[:3]:
-                st.write(f"- {vendor['name']}")
+            if vendors:
+                st.dataframe(pd.DataFrame(vendors, columns=['name', 'contact_email']), use_container_width=True,
+                             hide_index=True)
         except Exception as e:
             st.error(f"❌ Vendors Query Failed: {str(e)}")
 
@@ -66,6 +70,23 @@ def show_test_workflow():
         except Exception as e:
             st.error(f"❌ Evaluations Query Failed: {str(e)}")
 
+    if st.button("▶️ Run All Connection Tests"):
+        # The four queries are independent network calls, so run them concurrently and render afterwards
+        queries = {
+            "RFPs": lambda: db.get_rfps_for_user(user_id),
+            "Users": db.get_all_users,
+            "Vendors": db.get_all_vendors,
+            "Pending evaluations": lambda: db.get_pending_evaluations_for_user(user_id)
+        }
+        with ThreadPoolExecutor(max_workers=len(queries)) as executor:
+            futures = {name: executor.submit(query) for name, query in queries.items()}
+
+        for name, future in futures.items():
+            try:
+                st.success(f"✅ {name}: {len(future.result())} found")
+            except Exception as e:
+                st.error(f"❌ {name} Query Failed: {str(e)}")
+
     st.markdown("---")
 
     # Simple form test
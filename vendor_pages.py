@@ -1,44 +1,112 @@
+import copy
 import streamlit as st
-from config import get_db, format_date
+from config import (get_db, format_date, cached_vendor_count, cached_vendor_search, cached_vendor_search_index,
+                    cached_vendors_page, cached_vendor_by_id, clear_vendor_caches)
+
+VENDORS_PER_PAGE = 25
+VENDOR_ACTIONS = ["—", "Edit", "Delete"]
+
+# Session state used by the vendor pages and its defaults
+_STATE_DEFAULTS = {
+    'show_add_vendor': False,
+    'show_edit_vendor': False,
+    'edit_vendor_id': None,
+    'confirm_delete_vendor': None,
+    'vendor_cursor_stack': [],
+    'vendor_browse_active': False
+}
+
+
+def _init_state():
+    """Give every vendor page session key its default value"""
+    for key, value in _STATE_DEFAULTS.items():
+        # Copy so sessions never share the same mutable default
+        st.session_state.setdefault(key, copy.copy(value))
+
+
+def _vendor_row_action(vendor_id):
+    """Handle the action picked in a vendor row's menu"""
+    key = f"act_{vendor_id}"
+    action = st.session_state[key]
+    if action == "Edit":
+        st.session_state.edit_vendor_id = vendor_id
+        st.session_state.show_edit_vendor = True
+    elif action == "Delete":
+        st.session_state.confirm_delete_vendor = vendor_id
+    # Reset the menu so the same action can be picked again
+    st.session_state[key] = VENDOR_ACTIONS[0]
 
 
 def show_vendors_page():
     """Vendor management page"""
+    _init_state()
     st.markdown('<h1 class="main-header">🏢 Vendor Management</h1>', unsafe_allow_html=True)
 
-    db = get_db()
-
-    # Get all vendors
+    # Only the count is needed up front; the directory loads one page of rows
     try:
-        vendors = db.get_all_vendors()
+        vendor_count = cached_vendor_count()
     except Exception as e:
         st.error(f"Error loading vendors: {str(e)}")
-        vendors = []
+        vendor_count = 0
 
     # Header with actions
     col1, col2, col3 = st.columns([2, 1, 1])
     with col1:
-        search_term = st.text_input("Search vendors", placeholder="Search by name or email...")
+        # A form only submits on Enter or the button, so searches don't fire on every blur while typing
+        with st.form("vendor_search_form"):
+            search_term = st.text_input("Search vendors", placeholder="Search by name or email...")
+            st.form_submit_button("🔍 Search")
     with col2:
-        st.metric("Total Vendors", len(vendors))
+        st.metric("Total Vendors", vendor_count)
     with col3:
         if st.button("➕ Add New Vendor", type="primary"):
             st.session_state.show_add_vendor = True
             st.rerun()
 
     # Add vendor form (in sidebar or modal)
-    if st.session_state.get('show_add_vendor', False):
+    if st.session_state.show_add_vendor:
         show_add_vendor_form()
 
-    # Filter vendors based on search
+    show_vendor_directory(search_term)
+
+    # Edit vendor form
+    if st.session_state.show_edit_vendor:
+        show_edit_vendor_form()
+
+
+def show_vendor_directory(search_term):
+    """Show the vendor list for the current search term or page"""
+    # Nothing is fetched until the user searches or asks to browse the directory
+    if not search_term and not st.session_state.vendor_browse_active:
+        st.info("🔍 Search for a vendor above, or browse the full directory")
+        st.button("📂 Browse All", on_click=st.session_state.update, kwargs={'vendor_browse_active': True})
+        return
+
+    # Filter vendors based on search (matched in the database, first 50 results)
     if search_term:
-        filtered_vendors = [
-            v for v in vendors
-            if search_term.lower() in v.get('name', '').lower() or
-               search_term.lower() in v.get('contact_email', '').lower()
-        ]
+        try:
+            filtered_vendors = cached_vendor_search(search_term.strip())
+            if filtered_vendors is None:
+                # Term can't go into the database filter; scan the cached lowercase columns instead
+                term = search_term.strip().lower()
+                vendors, names, emails = cached_vendor_search_index()
+                matches = [i for i, name in enumerate(names) if term in name or term in emails[i]]
+                filtered_vendors = [vendors[i] for i in matches[:50]]
+        except Exception as e:
+            st.error(f"Error searching vendors: {str(e)}")
+            filtered_vendors = []
     else:
-        filtered_vendors = vendors
+        # Keyset pagination: the stack holds the (created_at, id) cursor of each page visited so far
+        cursor_stack = st.session_state.vendor_cursor_stack
+        after_created_at, after_id = cursor_stack[-1] if cursor_stack else (None, None)
+        try:
+            # One extra row tells us whether there is a next page
+            filtered_vendors = cached_vendors_page(after_created_at, after_id, VENDORS_PER_PAGE + 1)
+        except Exception as e:
+            st.error(f"Error loading vendors: {str(e)}")
+            filtered_vendors = []
+        has_next_page = len(filtered_vendors) > VENDORS_PER_PAGE
+        filtered_vendors = filtered_vendors[:VENDORS_PER_PAGE]
 
     # Display vendors
     if filtered_vendors:
@@ -66,28 +134,43 @@ def show_vendors_page():
                     st.caption(f"Added: {format_date(vendor.get('created_at', ''))}")
 
                 with col4:
-                    # Action buttons
-                    if st.button("✏️", key=f"edit_vendor_{vendor['id']}", help="Edit vendor"):
-                        st.session_state.edit_vendor_id = vendor['id']
-                        st.session_state.show_edit_vendor = True
-                        st.rerun()
-
-                    if st.button("🗑️", key=f"delete_vendor_{vendor['id']}", help="Delete vendor"):
-                        if st.session_state.get(f'confirm_delete_{vendor["id"]}', False):
-                            # Actually delete
+                    # One action menu per row instead of separate edit/delete buttons
+                    st.selectbox("Action", VENDOR_ACTIONS, key=f"act_{vendor['id']}", label_visibility="collapsed",
+                                 on_change=_vendor_row_action, args=(vendor['id'],))
+
+                if st.session_state.confirm_delete_vendor == vendor['id']:
+                    st.warning(f"Confirm deletion of {vendor['name']}?")
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        if st.button("🗑️ Delete", key=f"delete_vendor_{vendor['id']}"):
                             try:
                                 # Note: We'd need to add a delete_vendor method to DatabaseManager
+                                st.session_state.confirm_delete_vendor = None
                                 st.success(f"Vendor {vendor['name']} deleted")
                                 st.rerun()
                             except Exception as e:
                                 st.error(f"Error deleting vendor: {str(e)}")
-                        else:
-                            # Show confirmation
-                            st.session_state[f'confirm_delete_{vendor["id"]}'] = True
-                            st.warning(f"Click again to confirm deletion of {vendor['name']}")
+                    with col2:
+                        if st.button("Cancel", key=f"cancel_delete_vendor_{vendor['id']}"):
+                            st.session_state.confirm_delete_vendor = None
+                            st.rerun()
 
                 st.markdown("---")
 
+        if not search_term and (cursor_stack or has_next_page):
+            col1, col2, col3 = st.columns([1, 2, 1])
+            with col1:
+                if cursor_stack and st.button("⬅ Prev"):
+                    cursor_stack.pop()
+                    st.rerun()
+            with col2:
+                st.caption(f"Page {len(cursor_stack) + 1}")
+            with col3:
+                if has_next_page and st.button("Next ➡"):
+                    last_vendor = filtered_vendors[-1]
+                    cursor_stack.append((last_vendor['created_at'], last_vendor['id']))
+                    st.rerun()
+
     else:
         # Empty state
         if search_term:
@@ -104,17 +187,13 @@ def show_vendors_page():
             - 📈 Generate vendor analytics
             """)
 
-    # Edit vendor form
-    if st.session_state.get('show_edit_vendor', False):
-        show_edit_vendor_form()
-
 
 def show_add_vendor_form():
     """Show add vendor form in sidebar"""
     with st.sidebar:
         st.markdown("### ➕ Add New Vendor")
 
-        with st.form(f"add_vendor_form_{hash(str(st.session_state.user.id))}"):
+        with st.form(f"add_vendor_form_{st.session_state.user.id}"):
             name = st.text_input("Company Name*", placeholder="e.g., TechCorp Solutions")
             contact_person = st.text_input("Contact Person", placeholder="e.g., John Smith")
             contact_email = st.text_input("Contact Email*", placeholder="e.g., john@techcorp.com")
@@ -150,6 +229,7 @@ def show_add_vendor_form():
                     try:
                         new_vendor = db.create_vendor(vendor_data)
                         if new_vendor:
+                            clear_vendor_caches()
                             st.success(f"✅ Vendor '{name}' added successfully!")
                             st.session_state.show_add_vendor = False
                             st.rerun()
@@ -161,12 +241,12 @@ def show_add_vendor_form():
 
 def show_edit_vendor_form():
     """Show edit vendor form"""
-    vendor_id = st.session_state.get('edit_vendor_id')
+    vendor_id = st.session_state.edit_vendor_id
     if not vendor_id:
         return
 
     db = get_db()
-    vendor = db.get_vendor_by_id(vendor_id)
+    vendor = cached_vendor_by_id(vendor_id)
 
     if not vendor:
         st.error("Vendor not found")
@@ -211,6 +291,7 @@ def show_edit_vendor_form():
                     try:
                         updated_vendor = db.update_vendor(vendor_id, updates)
                         if updated_vendor:
+                            clear_vendor_caches()
                             st.success("✅ Vendor updated successfully!")
                             st.session_state.show_edit_vendor = False
                             st.session_state.edit_vendor_id = None